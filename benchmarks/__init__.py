@@ -0,0 +1,8 @@
+import os
+
+# Settings the app refuses to start without. Benchmarks point the app at
+# in-process fakes, so any value works; set before anything imports src.
+os.environ.setdefault("SUPABASE_URL", "http://fake-postgrest.local")
+os.environ.setdefault("SUPABASE_KEY", "benchmark-key")
+os.environ.setdefault("DUITKU_API_KEY", "benchmark-key")
+os.environ.setdefault("DUITKU_MERCHANT_CODE", "D0000")
@@ -0,0 +1,160 @@
+"""
+Measure goodput through a Supabase brownout with and without load shedding.
+
+The PostgREST stand-in serves at most --capacity requests at a time, each
+taking --service-ms; the rest queue inside the "database", as they do when
+Supabase runs out of connections. Order page reads (normal priority) and
+callback writes (critical priority) arrive at a fixed --rate. After
+--warm-up seconds within capacity, every request gets --slowdown times
+slower for --duration seconds, so the same traffic now exceeds capacity.
+
+Each run reports, for calls issued during the brownout and per traffic
+class, calls answered within --slo-ms (goodput), calls answered late, and
+calls shed with 503 by the adaptive limiter or circuit breaker.
+
+Usage:
+    python -m benchmarks.brownout --rate 300 --capacity 8 --service-ms 20 --slowdown 5
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Optional
+
+import httpx
+
+from benchmarks.fake_postgrest import FakePostgrest, bind_connections, build_order_dataset
+from src.core import supabase_connection
+from src.core.config import configs
+from src.core.limiter import PRIORITY_CRITICAL, PRIORITY_NORMAL, Overloaded, prioritize
+from src.services.order import OrderService
+
+
+def bind_to_congested_fake(fake: FakePostgrest, capacity: int, service_time: dict):
+    """Point every AsyncSupabaseConnection at a fake that serves `capacity` requests at a time."""
+    slots = asyncio.Semaphore(capacity)
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        async with slots:
+            await asyncio.sleep(service_time["seconds"])
+            return fake.handle(request)
+
+    bind_connections(httpx.MockTransport(handle))
+
+
+def reset_load_shedding(enabled: bool):
+    configs.supabase_limiter_enabled = enabled
+    supabase_connection.supabase_limiter.__init__(
+        "supabase",
+        initial_limit=configs.supabase_limiter_initial,
+        min_limit=configs.supabase_limiter_min,
+        max_limit=configs.supabase_limiter_max,
+        latency_target=configs.supabase_limiter_latency_target,
+        tolerance=configs.supabase_limiter_tolerance,
+        backoff=configs.supabase_limiter_backoff,
+        max_queue=configs.supabase_limiter_max_queue,
+        queue_timeout=configs.supabase_limiter_queue_timeout,
+    )
+    supabase_connection.supabase_breaker.__init__(
+        "supabase",
+        failure_threshold=configs.supabase_breaker_failure_threshold,
+        reset_timeout=configs.supabase_breaker_reset_timeout,
+    )
+
+
+async def read_orders(service: OrderService, num_orders: int):
+    prioritize(PRIORITY_NORMAL)
+    await service.get_orders(limit=20, after=random.randrange(num_orders))
+
+
+async def write_callback(payment: dict):
+    prioritize(PRIORITY_CRITICAL)
+    await supabase_connection.supabase_db.rpc("apply_payment_callbacks", {"callbacks": [{
+        "payment_id": payment["payment_id"],
+        "reference": payment["reference"],
+        "payment_status": "success",
+        "order_status": "processing",
+    }]})
+
+
+async def timed(kind: str, call, results: Optional[dict], slo: float):
+    start = time.perf_counter()
+    try:
+        await call
+        outcome = "ok" if time.perf_counter() - start <= slo else "late"
+    except Overloaded:
+        outcome = "shed"
+    except Exception as e:
+        outcome = "shed" if getattr(e, "status_code", None) == 503 else "error"
+    if results is not None:
+        results[kind][outcome] += 1
+
+
+async def run(args, dataset: dict, shedding: bool) -> dict:
+    reset_load_shedding(shedding)
+    fake = FakePostgrest({name: [dict(row) for row in rows] for name, rows in dataset.items()})
+    service_time = {"seconds": args.service_ms / 1000}
+    bind_to_congested_fake(fake, args.capacity, service_time)
+    service = OrderService()
+    num_orders = len(dataset["orders"])
+    results = {kind: {"ok": 0, "late": 0, "shed": 0, "error": 0} for kind in ("orders", "callbacks")}
+
+    tasks = []
+    interval = 1 / args.rate
+    start = time.perf_counter()
+    for i in range(int(args.rate * (args.warm_up + args.duration))):
+        delay = start + i * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        browned_out = i * interval >= args.warm_up
+        if browned_out:
+            service_time["seconds"] = args.service_ms * args.slowdown / 1000
+        counted = results if browned_out else None
+        if random.random() < args.callback_share:
+            call = timed("callbacks", write_callback(random.choice(dataset["payments"])), counted, args.slo_ms / 1000)
+        else:
+            call = timed("orders", read_orders(service, num_orders), counted, args.slo_ms / 1000)
+        tasks.append(asyncio.create_task(call))
+    await asyncio.gather(*tasks)
+
+    label = "shedding on " if shedding else "shedding off"
+    for kind, counts in results.items():
+        total = sum(counts.values())
+        print(f"{label} {kind:<9} goodput={counts['ok'] / args.duration:7.1f}/s  ok={counts['ok']:5}  "
+              f"late={counts['late']:5}  shed={counts['shed']:5}  error={counts['error']:4}  of {total}")
+    print(f"{label} drained after {time.perf_counter() - start:.1f}s, "
+          f"final limit {supabase_connection.supabase_limiter.limit:.1f}")
+    return results
+
+
+async def main_async(args):
+    configs.singleflight_enabled = False
+    configs.order_cache_enabled = False
+    dataset = build_order_dataset(args.orders, 4)
+    capacity = args.capacity * 1000 / args.service_ms
+    print(f"{args.rate}/s against {args.capacity} slots x {args.service_ms}ms ({capacity:.0f} requests/s) "
+          f"for {args.warm_up}s, then {args.slowdown}x slower ({capacity / args.slowdown:.0f} requests/s) "
+          f"for {args.duration}s, SLO {args.slo_ms}ms")
+    if not args.skip_baseline:
+        await run(args, dataset, shedding=False)
+    await run(args, dataset, shedding=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=300, help="calls per second offered")
+    parser.add_argument("--warm-up", type=float, default=2.0, help="seconds before the brownout")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of brownout")
+    parser.add_argument("--slowdown", type=float, default=5.0, help="how much slower requests get")
+    parser.add_argument("--capacity", type=int, default=8, help="requests the database serves at once")
+    parser.add_argument("--service-ms", type=float, default=20.0, help="database time per request")
+    parser.add_argument("--callback-share", type=float, default=0.2)
+    parser.add_argument("--slo-ms", type=float, default=1000.0)
+    parser.add_argument("--orders", type=int, default=300)
+    parser.add_argument("--skip-baseline", action="store_true", help="only run with load shedding on")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Compare full-table reads: the sequential OFFSET loop against
+AsyncSupabaseConnection.iter_rows with concurrent page fetching.
+
+Every request to the in-memory PostgREST stand-in is delayed by --latency
+seconds to model database and network time. The stand-in's own CPU time
+(filtering, JSON encoding) runs on the same event loop, so it is not hidden
+by concurrency. Peak memory is measured with tracemalloc while the rows are
+consumed.
+
+Usage:
+    python -m benchmarks.bulk_read --rows 20000 --batch-size 1000 --latency 0.25
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from benchmarks.fake_postgrest import FakePostgrest, bind_connections, build_order_dataset
+from src.core.supabase_connection import AsyncSupabaseConnection, supabase_orders
+
+
+async def sequential_offset_read(conn: AsyncSupabaseConnection, batch_size: int) -> int:
+    """The reader as it was: one page at a time, every row collected into a list."""
+    all_rows = []
+    offset = 0
+    while True:
+        res = await conn.table().select("*").range(offset, offset + batch_size - 1).execute()
+        if not res.data:
+            break
+        all_rows.extend(res.data)
+        offset += batch_size
+    return len(all_rows)
+
+
+async def concurrent_read(conn: AsyncSupabaseConnection, batch_size: int, concurrency: int) -> int:
+    count = 0
+    async for _ in conn.iter_rows(batch_size=batch_size, concurrency=concurrency, order_by="order_id"):
+        count += 1
+    return count
+
+
+async def measure(fake: FakePostgrest, label: str, coro) -> None:
+    fake.reset_counters()
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = await coro
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<16} rows={rows:<7} round_trips={fake.round_trips:<4} elapsed={elapsed:.3f}s peak_mem={peak / 1024 / 1024:.1f}MiB")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.25)
+    args = parser.parse_args()
+
+    fake = FakePostgrest(build_order_dataset(args.rows, 0))
+    bind_connections(fake.transport(latency=args.latency))
+    conn = supabase_orders
+
+    await measure(fake, "sequential", sequential_offset_read(conn, args.batch_size))
+    for concurrency in (1, 4, 8):
+        await measure(fake, f"iter_rows x{concurrency}", concurrent_read(conn, args.batch_size, concurrency))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""
+Measure the cost of turning a Duitku callback body into a Callback model.
+
+"before" is the previous path: Starlette's `Request.form()` (python-multipart's
+urlencoded parser behind a FormData) followed by a field-by-field Callback
+construction. "after" is `parse_callback_form`, which splits the raw bytes
+once, decodes only the known keys and validates with Callback's prebuilt
+pydantic-core validator. Both must produce the same model.
+
+Usage:
+    python -m benchmarks.callback_parsing --repeat 20000
+"""
+import argparse
+import asyncio
+import time
+from urllib.parse import urlencode
+
+from starlette.requests import Request
+
+from benchmarks.load_test import signed_callback
+from src.routes.callback import read_callback_form
+from src.schemas.callback import parse_callback_form
+
+
+def make_request(body: bytes) -> Request:
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/callback",
+        "headers": [
+            (b"content-type", b"application/x-www-form-urlencoded"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request(scope, receive)
+
+
+async def before(body: bytes):
+    return await read_callback_form(make_request(body))
+
+
+async def after(body: bytes):
+    # The route reads the body the same way before parsing it.
+    return parse_callback_form(await make_request(body).body())
+
+
+async def measure(label: str, func, body: bytes, repeat: int):
+    await func(body)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = await func(body)
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<8} {elapsed * 1e6:8.2f}µs per callback")
+    return elapsed, result
+
+
+async def run(repeat: int):
+    payment = {"payment_id": "INV-000042", "reference": "REF-000042", "amount": 150000}
+    form = signed_callback(payment)
+    form["productDetails"] = "Kaos polos + celana (2 pcs) @ Rp75.000"
+    body = urlencode(form).encode()
+
+    print(f"Callback body of {len(body)} bytes, {repeat} iterations")
+    time_before, model_before = await measure("before", before, body, repeat)
+    time_after, model_after = await measure("after", after, body, repeat)
+    assert model_before == model_after, "parsed callbacks differ"
+    print(f"Parse and validate cost reduced {time_before / time_after:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.repeat))
+
+
+if __name__ == "__main__":
+    main()
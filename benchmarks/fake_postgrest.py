@@ -0,0 +1,382 @@
+import asyncio
+import json
+import re
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from postgrest import AsyncPostgrestClient
+
+from src.core import supabase_connection
+from src.core.config import configs
+
+
+_FILTER_RE = re.compile(r"^(not\.)?(eq|neq|gt|gte|lt|lte|like|ilike|in|is)\.(.*)$", re.DOTALL)
+_RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _split_in_values(raw: str) -> List[str]:
+    """Split the body of an `in.(...)` filter, honouring double-quoted values."""
+    values, current, quoted = [], [], False
+    for char in raw.strip("()"):
+        if char == '"':
+            quoted = not quoted
+        elif char == "," and not quoted:
+            values.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if current or values:
+        values.append("".join(current))
+    return values
+
+
+def _as_text(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return "null"
+    return str(value)
+
+
+def _compare_key(value: Any):
+    try:
+        return (0, float(value))
+    except (TypeError, ValueError):
+        return (1, _as_text(value))
+
+
+def _like(pattern: str, value: str, flags: int = 0) -> bool:
+    regex = "^" + re.escape(pattern).replace(r"\*", ".*").replace("%", ".*") + "$"
+    return re.match(regex, value, flags) is not None
+
+
+def _project(rows: List[dict], select: Optional[str]) -> List[dict]:
+    """Apply a `select=` column list to rows; `*` or no select returns them whole."""
+    if not select or select == "*":
+        return rows
+    columns = [column.strip() for column in select.split(",")]
+    return [{column: row.get(column) for column in columns} for row in rows]
+
+
+def _compile_filter(column: str, expression: str) -> Callable[[dict], bool]:
+    """Parse one PostgREST filter once and return a predicate over rows."""
+    match = _FILTER_RE.match(expression)
+    if not match:
+        return lambda row: True
+    negate, op, operand = match.groups()
+
+    if op in ("eq", "is"):
+        test = lambda value: _as_text(value) == operand
+    elif op == "neq":
+        test = lambda value: _as_text(value) != operand
+    elif op == "in":
+        members = set(_split_in_values(operand))
+        test = lambda value: _as_text(value) in members
+    elif op == "like":
+        test = lambda value: _like(operand, _as_text(value))
+    elif op == "ilike":
+        test = lambda value: _like(operand, _as_text(value), re.IGNORECASE)
+    else:
+        bound = _compare_key(operand)
+        compare = {
+            "gt": lambda left: left > bound,
+            "gte": lambda left: left >= bound,
+            "lt": lambda left: left < bound,
+            "lte": lambda left: left <= bound,
+        }[op]
+        test = lambda value: compare(_compare_key(value))
+
+    if negate:
+        return lambda row: not test(row.get(column))
+    return lambda row: test(row.get(column))
+
+
+SETTLED_PAYMENT_STATUSES = ("success", "failed")
+# Casts Postgres would reject on write, for columns with a non-text type.
+PAYMENT_COLUMN_CHECKS = {"paid_at": datetime.fromisoformat, "settlement_date": date.fromisoformat}
+
+
+def apply_payment_callbacks(tables: Dict[str, List[dict]], params: dict, emit: Callable = None) -> List[dict]:
+    """In-memory version of migrations/001_apply_payment_callbacks.sql."""
+    emit = emit or (lambda *change: None)
+    results = []
+    for cb in params.get("callbacks", []):
+        payment = next(
+            (row for row in tables.get("payments", [])
+             if row.get("payment_id") == cb.get("payment_id") and row.get("reference") == cb.get("reference")),
+            None,
+        )
+        order_id = payment.get("order_id") if payment is not None else None
+        applied = payment is not None and (
+            payment.get("payment_status") not in SETTLED_PAYMENT_STATUSES
+            or payment.get("payment_status") == cb.get("payment_status")
+        )
+        error = None
+        try:
+            if applied:
+                old = dict(payment)
+                updates = {k: v for k, v in cb.items() if k not in ("payment_id", "reference", "order_status")}
+                for column, value in updates.items():
+                    validate = PAYMENT_COLUMN_CHECKS.get(column)
+                    if validate is not None and value is not None:
+                        validate(value)
+                payment.update(updates)
+                emit("payments", "UPDATE", payment, old)
+                for order in tables.get("orders", []):
+                    if order.get("order_id") == order_id:
+                        old = dict(order)
+                        order["status"] = cb.get("order_status")
+                        emit("orders", "UPDATE", order, old)
+        except Exception as e:
+            # Like the subtransaction around each callback in the SQL function.
+            order_id, applied, error = None, False, str(e)
+        results.append({
+            "payment_id": cb.get("payment_id"), "reference": cb.get("reference"), "order_id": order_id,
+            "applied": applied, "error": error,
+        })
+    return results
+
+
+DEFAULT_RPC = {"apply_payment_callbacks": apply_payment_callbacks}
+
+
+class FakePostgrest:
+    """
+    In-memory stand-in for a PostgREST endpoint.
+
+    Understands the subset of the PostgREST protocol issued by `SupabaseConnection`
+    (select with eq/in/range filters, ordering, limit/offset, exact counts, insert,
+    upsert, update, delete and rpc) and counts every request it serves, so
+    benchmarks can report backend round trips per operation.
+
+    Every row change is also passed to the callables in `listeners` as
+    (table, "INSERT" | "UPDATE" | "DELETE", new row, old row), which is how
+    benchmarks.fake_realtime turns writes into a change feed.
+
+    Args:
+        tables (dict): Table name to list of row dicts. Rows are mutated in place.
+        rpc (dict, optional): Function name to a callable taking (tables, params, emit),
+            where emit reports row changes like `listeners`.
+            Defaults to in-memory versions of the functions in migrations/.
+    """
+
+    def __init__(self, tables: Dict[str, List[dict]], rpc: Optional[Dict[str, Callable]] = None):
+        self.tables = tables
+        self.rpc = DEFAULT_RPC if rpc is None else rpc
+        self.round_trips = 0
+        self.requests_by_table: Dict[str, int] = {}
+        self.listeners: List[Callable[[str, str, Optional[dict], Optional[dict]], None]] = []
+
+    def emit(self, table: str, change: str, new: Optional[dict], old: Optional[dict]):
+        for listener in self.listeners:
+            listener(table, change, dict(new) if new else None, dict(old) if old else None)
+
+    def reset_counters(self):
+        self.round_trips = 0
+        self.requests_by_table = {}
+
+    def transport(self, latency: float = 0.0) -> httpx.MockTransport:
+        """
+        Return an httpx transport that answers requests from the in-memory tables.
+
+        Args:
+            latency (float, optional): Simulated database time per request in seconds.
+                A non-zero latency needs an httpx.AsyncClient.
+        """
+        if not latency:
+            return httpx.MockTransport(self.handle)
+
+        async def handle(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(latency)
+            return self.handle(request)
+
+        return httpx.MockTransport(handle)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.round_trips += 1
+        path = request.url.path.rstrip("/")
+        name = path.rsplit("/", 1)[-1]
+        self.requests_by_table[name] = self.requests_by_table.get(name, 0) + 1
+
+        body = json.loads(request.content) if request.content else None
+        if "/rpc/" in path:
+            return self._handle_rpc(name, body)
+
+        rows = self.tables.setdefault(name, [])
+        params = request.url.params
+        prefer = request.headers.get("prefer", "")
+        filters = [_compile_filter(k, v) for k, v in params.multi_items() if k not in _RESERVED_PARAMS]
+        matched = [row for row in rows if all(predicate(row) for predicate in filters)]
+
+        if request.method in ("GET", "HEAD"):
+            return self._handle_select(request, params, prefer, matched)
+        if request.method == "PATCH":
+            for row in matched:
+                old = dict(row) if self.listeners else None
+                row.update(body)
+                self.emit(name, "UPDATE", row, old)
+            return self._respond(prefer, matched, status_code=200, select=params.get("select"))
+        if request.method == "DELETE":
+            for row in matched:
+                rows.remove(row)
+                self.emit(name, "DELETE", None, row)
+            return self._respond(prefer, matched, status_code=200, select=params.get("select"))
+        if request.method == "POST":
+            return self._handle_insert(name, rows, params, prefer, body)
+        return httpx.Response(405)
+
+    def _handle_select(self, request, params, prefer, matched):
+        for spec in reversed((params.get("order") or "").split(",")):
+            if not spec:
+                continue
+            column, _, direction = spec.partition(".")
+            matched = sorted(
+                matched,
+                key=lambda row: _compare_key(row.get(column)),
+                reverse=direction.startswith("desc"),
+            )
+        total = len(matched)
+        offset = int(params.get("offset") or 0)
+        limit = params.get("limit")
+        page = matched[offset:offset + int(limit)] if limit is not None else matched[offset:]
+
+        select = params.get("select") or "*"
+        if select == "count":
+            page = [{"count": total}]
+        else:
+            page = _project(page, select)
+
+        headers = {"content-range": f"{offset}-{offset + max(len(page) - 1, 0)}/{total}"}
+        if request.method == "HEAD":
+            return httpx.Response(200, headers=headers)
+        return httpx.Response(200, json=page, headers=headers)
+
+    def _handle_insert(self, name, rows, params, prefer, body):
+        new_rows = body if isinstance(body, list) else [body]
+        conflict = [c for c in (params.get("on_conflict") or "").split(",") if c]
+        written = []
+        for new_row in new_rows:
+            existing = None
+            if conflict:
+                existing = next(
+                    (row for row in rows if all(_as_text(row.get(c)) == _as_text(new_row.get(c)) for c in conflict)),
+                    None,
+                )
+            if existing is not None:
+                old = dict(existing) if self.listeners else None
+                existing.update(new_row)
+                written.append(existing)
+                self.emit(name, "UPDATE", existing, old)
+            else:
+                rows.append(dict(new_row))
+                written.append(rows[-1])
+                self.emit(name, "INSERT", rows[-1], None)
+        return self._respond(prefer, written, status_code=201, select=params.get("select"))
+
+    def _handle_rpc(self, name, params):
+        func = self.rpc.get(name)
+        if func is None:
+            return httpx.Response(404, json={"message": f"function {name} does not exist"})
+        return httpx.Response(200, json=func(self.tables, params or {}, self.emit))
+
+    @staticmethod
+    def _respond(prefer: str, rows: List[dict], status_code: int, select: Optional[str] = None) -> httpx.Response:
+        if "return=minimal" in prefer:
+            return httpx.Response(204)
+        return httpx.Response(status_code, json=_project(rows, select))
+
+
+class FakePostgrestASGI:
+    """
+    Serve a FakePostgrest over real HTTP, e.g. with uvicorn, for out-of-process clients.
+
+    Args:
+        fake (FakePostgrest): The in-memory tables and counters to serve.
+        latency (float, optional): Simulated database time per request in seconds.
+    """
+
+    def __init__(self, fake: FakePostgrest, latency: float = 0.0):
+        self.fake = fake
+        self.latency = latency
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        url = f"http://fake-postgrest{scope['path']}"
+        if scope.get("query_string"):
+            url += "?" + scope["query_string"].decode()
+        request = httpx.Request(scope["method"], url, headers=scope["headers"], content=body)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        response = self.fake.handle(request)
+
+        content = b"" if scope["method"] == "HEAD" else response.content
+        headers = [(k, v) for k, v in response.headers.raw if k.lower() != b"content-length"]
+        headers.append((b"content-length", str(len(content)).encode()))
+        await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": content})
+
+
+def build_order_dataset(num_orders: int, items_per_order: int, num_products: int = 200) -> Dict[str, List[dict]]:
+    """Generate orders, order_details, payments and master_products rows shaped like production data."""
+    products = [
+        {"sku": f"SKU-{i:05d}", "name": f"Product {i}", "price": 10000 + i}
+        for i in range(num_products)
+    ]
+    orders, details, payments = [], [], []
+    for order_id in range(1, num_orders + 1):
+        orders.append({
+            "order_id": order_id,
+            "customer_id": 1000 + order_id % 97,
+            "order_date": "2025-07-01T10:00:00",
+            "status": "unpaid",
+            "address": "Jl. Sudirman No. 1",
+            "city": "Jakarta",
+            "district": "Tanah Abang",
+            "subdistrict": "Karet Tengsin",
+            "province": "DKI Jakarta",
+            "postal_code": "10220",
+            "shipping_name": "JNE",
+            "service_type": "REG",
+            "service_name": "Reguler",
+            "shipping_cost": 12000,
+            "is_cod": False,
+            "estimated_delivery_date": "2025-07-04T10:00:00",
+        })
+        for line in range(items_per_order):
+            product = products[(order_id * items_per_order + line) % num_products]
+            details.append({
+                "order_id": order_id,
+                "sku": product["sku"],
+                "quantity": 1 + line,
+                "unit_price": product["price"],
+            })
+        payments.append({
+            "payment_id": f"INV-{order_id:06d}",
+            "order_id": order_id,
+            "reference": f"REF-{order_id:06d}",
+            "amount": sum(d["unit_price"] * d["quantity"] for d in details[-items_per_order:]) if items_per_order else 0,
+            "payment_status": "pending",
+        })
+    return {"orders": orders, "order_details": details, "payments": payments, "master_products": products}
+
+
+def bind_connections(transport: httpx.AsyncBaseTransport) -> AsyncPostgrestClient:
+    """Point every global AsyncSupabaseConnection at one PostgREST client over `transport`."""
+    client = AsyncPostgrestClient(
+        f"{configs.supabase_url}/rest/v1",
+        http_client=httpx.AsyncClient(transport=transport),
+    )
+    for name in dir(supabase_connection):
+        conn = getattr(supabase_connection, name)
+        if isinstance(conn, supabase_connection.AsyncSupabaseConnection):
+            conn.client = client
+    return client
@@ -0,0 +1,120 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from websockets.asyncio.server import ServerConnection, serve
+
+from benchmarks.fake_postgrest import FakePostgrest
+
+
+class FakeRealtime:
+    """
+    Local stand-in for Supabase Realtime's postgres_changes feed.
+
+    Speaks the subset of the Phoenix channel protocol that realtime-py uses
+    (phx_join with postgres_changes bindings, heartbeat, phx_leave) over a
+    websocket at `{url}/websocket`, and forwards every row change of a
+    FakePostgrest to the channels whose bindings match its table, like the
+    real service does for tables in the supabase_realtime publication. Old
+    rows are sent whole, as with REPLICA IDENTITY FULL.
+
+    Args:
+        fake (FakePostgrest): The tables whose changes are published
+        delay (float, optional): Seconds between a change and its delivery, to simulate replication lag
+    """
+
+    def __init__(self, fake: FakePostgrest, delay: float = 0.0):
+        self.fake = fake
+        self.delay = delay
+        self.url = ""
+        self.sent = 0
+        self._server = None
+        # Per connection: its outgoing queue and its joined topics with their bindings.
+        self._connections: Dict[ServerConnection, asyncio.Queue] = {}
+        self._bindings: Dict[ServerConnection, Dict[str, List[dict]]] = {}
+        fake.listeners.append(self.publish)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the http URL to pass to AsyncRealtimeClient."""
+        self._server = await serve(self._handle, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def drop_connections(self):
+        """Close every client connection abruptly, as a network failure would."""
+        for connection in list(self._connections):
+            await connection.close(code=1011, reason="fake outage")
+
+    @property
+    def subscribers(self) -> int:
+        return sum(len(topics) for topics in self._bindings.values())
+
+    def publish(self, table: str, change: str, new: Optional[dict], old: Optional[dict]):
+        """FakePostgrest listener: queue the change for every matching binding."""
+        data = {
+            "schema": "public",
+            "table": table,
+            "commit_timestamp": datetime.now(timezone.utc).isoformat(),
+            "type": change,
+            "record": new or {},
+            "old_record": old or {},
+            "columns": [{"name": name} for name in (new or old or {})],
+            "errors": None,
+        }
+        for connection, topics in self._bindings.items():
+            for topic, bindings in topics.items():
+                ids = [
+                    binding["id"] for binding in bindings
+                    if binding.get("table") in (table, "*") and binding.get("event") in (change, "*")
+                ]
+                if ids:
+                    self._send(connection, topic, "postgres_changes", {"ids": ids, "data": data})
+
+    def _send(self, connection: ServerConnection, topic: str, event: str, payload: dict, ref=None, join_ref=None):
+        queue = self._connections.get(connection)
+        if queue is not None:
+            message = {"topic": topic, "event": event, "payload": payload, "ref": ref, "join_ref": join_ref}
+            queue.put_nowait((asyncio.get_running_loop().time() + self.delay, json.dumps(message, default=str)))
+
+    async def _writer(self, connection: ServerConnection, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            due, message = await queue.get()
+            if due > loop.time():
+                await asyncio.sleep(due - loop.time())
+            await connection.send(message)
+            self.sent += 1
+
+    async def _handle(self, connection: ServerConnection):
+        queue = asyncio.Queue()
+        self._connections[connection] = queue
+        self._bindings[connection] = {}
+        writer = asyncio.create_task(self._writer(connection, queue))
+        try:
+            async for raw in connection:
+                message = json.loads(raw)
+                topic, event, ref = message.get("topic"), message.get("event"), message.get("ref")
+                join_ref = message.get("join_ref")
+                response = {}
+                if event == "phx_join":
+                    filters = message.get("payload", {}).get("config", {}).get("postgres_changes", [])
+                    bindings = [{"id": index + 1, "filter": None, **binding} for index, binding in enumerate(filters)]
+                    self._bindings[connection][topic] = bindings
+                    response = {"postgres_changes": bindings}
+                elif event == "phx_leave":
+                    self._bindings[connection].pop(topic, None)
+                self._send(connection, topic, "phx_reply", {"status": "ok", "response": response}, ref, join_ref)
+        except Exception:
+            pass
+        finally:
+            writer.cancel()
+            self._connections.pop(connection, None)
+            self._bindings.pop(connection, None)
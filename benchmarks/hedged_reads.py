@@ -0,0 +1,101 @@
+"""
+Measure GET /orders tail latency with and without hedged PostgREST reads.
+
+The PostgREST stand-in answers most requests in --fast-ms, but a random
+--slow-share of them take --slow-ms, the occasional slow request that holds
+up a whole order page assembly. Pages are loaded through OrderService with
+--concurrency callers, first with hedging off and then on, and each run
+reports p50/p95/p99 latency, the extra requests hedging sent, and how often
+the hedge answered first.
+
+Usage:
+    python -m benchmarks.hedged_reads --pages 2000 --slow-share 0.02
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+from benchmarks.fake_postgrest import FakePostgrest, bind_connections, build_order_dataset
+from src.core import supabase_connection
+from src.core.config import configs
+from src.services.order import OrderService
+
+
+def bind_to_long_tail_fake(fake: FakePostgrest, fast: float, slow: float, slow_share: float):
+    """Point every AsyncSupabaseConnection at a fake where a share of requests is slow."""
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(slow if random.random() < slow_share else fast)
+        return fake.handle(request)
+
+    bind_connections(httpx.MockTransport(handle))
+
+
+def hedge_counts() -> dict:
+    counts = {"won": 0, "lost": 0}
+    for (_, _, result), value in supabase_connection.supabase_read_hedges._values.items():
+        counts[result] += value
+    return counts
+
+
+async def run(args, fake: FakePostgrest, num_orders: int, hedging: bool):
+    configs.supabase_hedge_enabled = hedging
+    service = OrderService()
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(args.pages):
+        queue.put_nowait(random.randrange(num_orders))
+
+    async def caller():
+        while not queue.empty():
+            after = queue.get_nowait()
+            start = time.perf_counter()
+            await service.get_orders(limit=20, after=after)
+            latencies.append(time.perf_counter() - start)
+
+    before = hedge_counts()
+    fake.reset_counters()
+    await asyncio.gather(*(caller() for _ in range(args.concurrency)))
+    after = hedge_counts()
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+    fired = after["won"] + after["lost"] - before["won"] - before["lost"]
+    won = after["won"] - before["won"]
+    label = "hedging on " if hedging else "hedging off"
+    print(f"{label} p50={p(0.5):6.1f}ms  p95={p(0.95):6.1f}ms  p99={p(0.99):6.1f}ms  "
+          f"mean={statistics.mean(latencies) * 1000:6.1f}ms  answered={fake.round_trips}  "
+          f"hedges={int(fired)} won={int(won)}")
+
+
+async def main_async(args):
+    configs.singleflight_enabled = False
+    configs.order_cache_enabled = False
+    dataset = build_order_dataset(args.orders, 4)
+    fake = FakePostgrest(dataset)
+    bind_to_long_tail_fake(fake, args.fast_ms / 1000, args.slow_ms / 1000, args.slow_share)
+    print(f"{args.pages} pages, {args.concurrency} callers, {args.slow_share:.0%} of requests take "
+          f"{args.slow_ms}ms instead of {args.fast_ms}ms, hedge at p{configs.supabase_hedge_percentile:g}")
+    # Warm the product cache and the latency windows hedging picks its delay from.
+    await run(args, fake, len(dataset["orders"]), hedging=False)
+    await run(args, fake, len(dataset["orders"]), hedging=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--orders", type=int, default=300)
+    parser.add_argument("--fast-ms", type=float, default=5.0)
+    parser.add_argument("--slow-ms", type=float, default=200.0)
+    parser.add_argument("--slow-share", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+Offline load test of the running service against local stand-ins for Supabase and Redis.
+
+Starts an in-memory PostgREST (benchmarks.fake_postgrest served by uvicorn) and
+a fakeredis server in this process, launches the app under uvicorn in a
+subprocess pointed at both, then replays traffic against it:
+
+    POST /callback              signed Duitku form posts, with a share of re-sends
+    GET /orders                 keyset pages at random cursors
+    PUT /orders/update-status   random status changes
+
+Each scenario reports throughput, p50/p95/p99 latency and the Supabase round
+trips and Redis commands per request. Callbacks are written by the stream
+worker after the response, so the counters are read once backend traffic has
+settled. Results are saved as JSON named after the current commit; pass
+--compare with an earlier file to see the difference.
+
+Requires fakeredis (pip install "fakeredis[lua]"), which is not a service dependency.
+
+Usage:
+    python -m benchmarks.load_test --requests 2000 --concurrency 50
+    python -m benchmarks.load_test --compare benchmarks/results/<commit>.json
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import httpx
+import uvicorn
+
+from benchmarks.fake_postgrest import FakePostgrest, FakePostgrestASGI, build_order_dataset
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+API_KEY = "benchmark-key"
+MERCHANT_CODE = "D0000"
+ORDER_STATUSES = ["unpaid", "processing", "shipped", "cancelled", "completed"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_postgrest(fake: FakePostgrest, latency: float) -> int:
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        FakePostgrestASGI(fake, latency), host="127.0.0.1", port=port, log_level="warning", lifespan="off",
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return port
+
+
+def start_fake_redis() -> int:
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        sys.exit('The load test needs fakeredis: pip install "fakeredis[lua]"')
+    port = free_port()
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return port
+
+
+def start_app(postgrest_port: int, redis_port: int, app_port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "SUPABASE_URL": f"http://127.0.0.1:{postgrest_port}",
+        "SUPABASE_KEY": API_KEY,
+        "DUITKU_API_KEY": API_KEY,
+        "DUITKU_MERCHANT_CODE": MERCHANT_CODE,
+        "REDIS_URL": f"redis://127.0.0.1:{redis_port}/0",
+        "LOG_LEVEL": "WARNING",
+        "ACCESS_LOG_SUCCESS_SAMPLE_RATE": "0",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1",
+         "--port", str(app_port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"The app exited during startup with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/metrics", timeout=1.0).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    sys.exit("The app did not become ready in time")
+
+
+def redis_command_count(base_url: str) -> int:
+    """Total Redis commands the app has issued, read from its /metrics endpoint."""
+    total = 0
+    for line in httpx.get(f"{base_url}/metrics").text.splitlines():
+        if line.startswith("redis_command_duration_seconds_count"):
+            total += int(float(line.rsplit(" ", 1)[1]))
+    return total
+
+
+def signed_callback(payment: dict, result_code: str = "00") -> dict:
+    """A Duitku callback form for a payment, signed the way CallbackService.verify_signature expects."""
+    amount = payment["amount"]
+    raw = f"{MERCHANT_CODE}{amount}{payment['payment_id']}{API_KEY}"
+    return {
+        "merchantCode": MERCHANT_CODE,
+        "amount": str(amount),
+        "merchantOrderId": payment["payment_id"],
+        "productDetails": "Benchmark order",
+        "additionalParam": "",
+        "paymentCode": "VC",
+        "resultCode": result_code,
+        "merchantUserId": "benchmark@example.com",
+        "reference": payment["reference"],
+        "signature": hashlib.md5(raw.encode("utf-8")).hexdigest(),
+        "publisherOrderId": f"PUB-{payment['payment_id']}",
+        "spUserHash": "",
+        "settlementDate": "2025-07-01",
+        "issuerCode": "",
+    }
+
+
+def callback_requests(payments: List[dict], count: int, resend_ratio: float) -> List[dict]:
+    """Callbacks for distinct payments, amplified with re-sends of ones already posted."""
+    sent, out = [], []
+    fresh = iter(random.sample(payments, len(payments)))
+    for _ in range(count):
+        payment = next(fresh, None)
+        if payment is None or (sent and random.random() < resend_ratio):
+            form = random.choice(sent)
+        else:
+            form = signed_callback(payment)
+            sent.append(form)
+        out.append({"method": "POST", "url": "/callback", "data": form})
+    return out
+
+
+def order_page_requests(num_orders: int, count: int, page_size: int) -> List[dict]:
+    return [
+        {"method": "GET", "url": "/orders", "params": {"limit": page_size, "after": random.randrange(num_orders)}}
+        for _ in range(count)
+    ]
+
+
+def update_status_requests(num_orders: int, count: int) -> List[dict]:
+    return [
+        {"method": "PUT", "url": "/orders/update-status",
+         "json": {"order_id": random.randint(1, num_orders), "status": random.choice(ORDER_STATUSES)}}
+        for _ in range(count)
+    ]
+
+
+async def replay(base_url: str, requests: List[dict], concurrency: int):
+    """Send every request with at most `concurrency` in flight; return latencies and error count."""
+    queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                request = queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    response = await client.request(**request)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def wait_for_settle(fake: FakePostgrest, quiet: float = 2.0, timeout: float = 60.0):
+    """Wait until no Supabase request has arrived for `quiet` seconds (background writers done)."""
+    deadline = time.monotonic() + timeout
+    last, last_change = fake.round_trips, time.monotonic()
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        if fake.round_trips != last:
+            last, last_change = fake.round_trips, time.monotonic()
+        elif time.monotonic() - last_change >= quiet:
+            return
+
+
+def run_scenario(name: str, base_url: str, fake: FakePostgrest, requests: List[dict], concurrency: int, settle: bool) -> dict:
+    wait_for_settle(fake, quiet=0.5)
+    fake.reset_counters()
+    redis_before = redis_command_count(base_url)
+
+    latencies, errors, elapsed = asyncio.run(replay(base_url, requests, concurrency))
+    if settle:
+        wait_for_settle(fake)
+
+    redis_commands = redis_command_count(base_url) - redis_before - 1  # minus the /metrics read itself
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    result = {
+        "requests": len(requests),
+        "errors": errors,
+        "throughput_rps": round(len(requests) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "supabase_round_trips_per_request": round(fake.round_trips / len(requests), 3),
+        "supabase_requests_by_table": dict(fake.requests_by_table),
+        "redis_commands_per_request": round(max(redis_commands, 0) / len(requests), 3),
+    }
+    print(
+        f"{name:<28} {result['throughput_rps']:>8.1f} req/s  p50={result['p50_ms']:>7.2f}ms  "
+        f"p95={result['p95_ms']:>7.2f}ms  p99={result['p99_ms']:>7.2f}ms  errors={errors:<4} "
+        f"supabase/req={result['supabase_round_trips_per_request']:<6} redis/req={result['redis_commands_per_request']}"
+    )
+    return result
+
+
+def git_revision() -> str:
+    try:
+        revision = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], cwd=ROOT).returncode != 0
+        return f"{revision}-dirty" if dirty else revision
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, baseline_path: Path):
+    baseline = json.loads(baseline_path.read_text())
+    print(f"\nCompared with {baseline.get('revision')} ({baseline_path}):")
+    keys = ["throughput_rps", "p50_ms", "p95_ms", "p99_ms", "supabase_round_trips_per_request", "redis_commands_per_request"]
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        changes = []
+        for key in keys:
+            old, new = before.get(key), result.get(key)
+            if old:
+                changes.append(f"{key}={new} ({(new - old) / old * 100:+.1f}%)")
+        print(f"  {name}: " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--resend-ratio", type=float, default=0.2, help="share of callbacks that are re-sends")
+    parser.add_argument("--latency", type=float, default=0.005, help="simulated database time per request (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, default=None, help="results file (default: benchmarks/results/<revision>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="earlier results file to compare against")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    fake = FakePostgrest(build_order_dataset(args.orders, args.items))
+    postgrest_port = start_fake_postgrest(fake, args.latency)
+    redis_port = start_fake_redis()
+    app_port = free_port()
+    base_url = f"http://127.0.0.1:{app_port}"
+    app = start_app(postgrest_port, redis_port, app_port)
+
+    scenarios: Dict[str, Callable[[], List[dict]]] = {
+        "POST /callback": lambda: callback_requests(fake.tables["payments"], args.requests, args.resend_ratio),
+        "GET /orders": lambda: order_page_requests(args.orders, args.requests, args.page_size),
+        "PUT /orders/update-status": lambda: update_status_requests(args.orders, args.requests),
+    }
+    results = {}
+    try:
+        wait_until_ready(base_url, app)
+        print(f"{args.requests} requests per scenario, concurrency {args.concurrency}, "
+              f"{args.orders} orders x {args.items} items, database latency {args.latency * 1000:.1f}ms")
+        for name, build in scenarios.items():
+            results[name] = run_scenario(name, base_url, fake, build(), args.concurrency, settle=name == "POST /callback")
+    finally:
+        app.terminate()
+        app.wait(timeout=10)
+
+    revision = git_revision()
+    report = {
+        "revision": revision,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+        "scenarios": results,
+    }
+    output = args.output or RESULTS_DIR / f"{revision}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
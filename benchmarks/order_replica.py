@@ -0,0 +1,102 @@
+"""
+Measure GET /orders served from the in-process order replica against PostgREST.
+
+Orders are loaded through OrderService from a PostgREST stand-in that takes
+--latency-ms per request, first with the replica off and then from a replica
+kept in sync by a local fake of Supabase Realtime. While the replica serves
+pages, --writes status updates go through PostgREST; each run reports page
+latency and PostgREST round trips, then the replica reports how long writes
+took to show up in it (--feed-delay-ms simulates replication delay) and its
+estimated memory use.
+
+Usage:
+    python -m benchmarks.order_replica --orders 5000 --pages 2000 --latency-ms 5
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from benchmarks.fake_postgrest import FakePostgrest, bind_connections, build_order_dataset
+from benchmarks.fake_realtime import FakeRealtime
+from src.core import supabase_connection
+from src.core.config import configs
+from src.services.order import OrderService, order_replica
+
+
+async def read_pages(args, fake: FakePostgrest, num_orders: int, label: str):
+    service = OrderService()
+    latencies = []
+    fake.reset_counters()
+    for _ in range(args.pages):
+        after = random.randrange(num_orders - args.page_size)
+        start = time.perf_counter()
+        await service.get_orders(limit=args.page_size, after=after)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"{label:<8} mean={statistics.mean(latencies) * 1000:7.3f}ms  "
+          f"p99={latencies[int(len(latencies) * 0.99)] * 1000:7.3f}ms  round trips={fake.round_trips}")
+
+
+async def measure_freshness(args, num_orders: int):
+    """Write order statuses through PostgREST and time until the replica shows them."""
+    delays = []
+    for i in range(args.writes):
+        order_id = random.randrange(num_orders) + 1
+        status = f"status-{i}"
+        start = time.perf_counter()
+        await supabase_connection.supabase_orders.update_where({"order_id": order_id}, {"status": status})
+        while order_replica.orders[order_id]["status"] != status:
+            await asyncio.sleep(0.0005)
+        delays.append(time.perf_counter() - start)
+    print(f"writes visible in the replica after mean={statistics.mean(delays) * 1000:.1f}ms "
+          f"max={max(delays) * 1000:.1f}ms (including the write itself), "
+          f"feed lag {order_replica.lag * 1000:.1f}ms")
+
+
+async def main_async(args):
+    configs.order_cache_enabled = False
+    configs.order_replica_max_orders = args.orders
+    dataset = build_order_dataset(args.orders, args.items)
+    fake = FakePostgrest(dataset)
+    bind_connections(fake.transport(latency=args.latency_ms / 1000))
+    realtime = FakeRealtime(fake, delay=args.feed_delay_ms / 1000)
+    configs.order_replica_realtime_url = await realtime.start()
+    num_orders = len(dataset["orders"])
+    print(f"{args.pages} pages of {args.page_size} from {num_orders} orders x {args.items} items, "
+          f"PostgREST latency {args.latency_ms}ms")
+
+    configs.order_replica_enabled = False
+    await read_pages(args, fake, num_orders, "postgrest")
+
+    configs.order_replica_enabled = True
+    start = time.perf_counter()
+    await order_replica.start()
+    while not order_replica.ready:
+        await asyncio.sleep(0.01)
+    stats = order_replica.stats()
+    print(f"replica synced {stats['orders']} orders, {stats['order_details']} items and {stats['products']} products "
+          f"in {time.perf_counter() - start:.2f}s, ~{order_replica.memory_bytes() / 2 ** 20:.1f} MiB")
+    await read_pages(args, fake, num_orders, "replica")
+    await measure_freshness(args, num_orders)
+
+    await order_replica.stop()
+    await realtime.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--items", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--writes", type=int, default=100)
+    parser.add_argument("--feed-delay-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Count PostgREST round trips made by `OrderService.get_orders`.
+
+Runs the legacy per-order / per-item loader and the batched loader against the
+same in-memory PostgREST stand-in and prints the number of requests each one
+issues for a page of orders.
+
+Usage:
+    python -m benchmarks.order_round_trips --orders 500 --items 4
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.fake_postgrest import FakePostgrest, bind_connections, build_order_dataset
+from src.core import supabase_connection
+from src.services.order import OrderService
+
+
+async def legacy_get_orders():
+    """The loader as it was before batching: one query per order and per line item."""
+    orders = await supabase_connection.supabase_orders.select_all()
+    for order in orders:
+        details = await supabase_connection.supabase_orders_details.select_where(
+            conditions={"order_id": order.get("order_id")}
+        )
+        for item in details:
+            await supabase_connection.supabase_products.select_where(conditions={"sku": item.get("sku")})
+    return orders
+
+
+def measure(fake: FakePostgrest, label: str, func):
+    fake.reset_counters()
+    start = time.perf_counter()
+    asyncio.run(func())
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} round_trips={fake.round_trips:<6} by_table={fake.requests_by_table} elapsed={elapsed:.3f}s")
+    return fake.round_trips
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--items", type=int, default=4)
+    args = parser.parse_args()
+
+    fake = FakePostgrest(build_order_dataset(args.orders, args.items))
+    bind_connections(fake.transport())
+    service = OrderService()
+
+    print(f"GET /orders?limit={args.orders} with {args.orders} orders x {args.items} items")
+    before = measure(fake, "before", legacy_get_orders)
+    page = lambda: service.get_orders(limit=args.orders)
+    after = measure(fake, "after", page)
+    warm = measure(fake, "warm", page)
+    print(f"round trips reduced {before} -> {after} ({before / max(after, 1):.0f}x), {warm} with a warm product cache")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Measure the CPU time and allocations of building a GET /orders response body.
+
+"before" rebuilds the previous path: nested Order/Address/Shipping/Product
+models constructed field by field, then FastAPI's response_model handling
+(dump, re-validate, jsonable_encoder) and the stdlib JSON encoder.
+"after" validates the page once with `order_list_adapter` and serializes it
+once with pydantic-core into a FastJSONResponse. Both produce the same body.
+
+Usage:
+    python -m benchmarks.order_serialization --orders 1000 --items 4
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+import orjson
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from benchmarks.fake_postgrest import build_order_dataset
+from src.core.responses import FastJSONResponse
+from src.schemas.order import Address, Order, OrderResponse, Product, Shipping, order_list_adapter
+
+
+def join(dataset: dict):
+    products = {product["sku"]: product for product in dataset["master_products"]}
+    details = {}
+    for item in dataset["order_details"]:
+        details.setdefault(item["order_id"], []).append(item)
+    return dataset["orders"], details, products
+
+
+def before(orders, details, products) -> bytes:
+    models = []
+    for order in orders:
+        model = Order(
+            order_id=order.get("order_id"),
+            customer_id=order.get("customer_id"),
+            order_date=order.get("order_date"),
+            status=order.get("status"),
+            address=Address(**{k: order.get(k) for k in Address.model_fields}),
+            shipping_info=Shipping(**{k: order.get(k) for k in Shipping.model_fields}),
+            items=[],
+        )
+        for item in details.get(order["order_id"], []):
+            model.items.append(Product(
+                name=products[item["sku"]]["name"],
+                quantity=item["quantity"],
+                sku=item["sku"],
+                unit_price=item["unit_price"],
+            ))
+        models.append(model)
+    response = OrderResponse(message="Orders retrieved successfully", data=models)
+    field = create_model_field("Response_get_orders", OrderResponse)
+    content = asyncio.run(serialize_response(field=field, response_content=response))
+    return JSONResponse(content).body
+
+
+def after(orders, details, products) -> bytes:
+    models = order_list_adapter.validate_python([
+        {
+            "order_id": order.get("order_id"),
+            "customer_id": order.get("customer_id"),
+            "order_date": order.get("order_date"),
+            "status": order.get("status"),
+            "address": {k: order.get(k) for k in Address.model_fields},
+            "shipping_info": {k: order.get(k) for k in Shipping.model_fields},
+            "items": [
+                {"name": products[item["sku"]]["name"], "quantity": item["quantity"],
+                 "sku": item["sku"], "unit_price": item["unit_price"]}
+                for item in details.get(order["order_id"], [])
+            ],
+        }
+        for order in orders
+    ])
+    return FastJSONResponse({
+        "message": "Orders retrieved successfully",
+        "data": orjson.Fragment(order_list_adapter.dump_json(models, exclude_none=True)),
+        "next_cursor": None,
+    }).body
+
+
+def measure(label: str, func, args, repeat: int):
+    func(*args)
+    start = time.process_time()
+    for _ in range(repeat):
+        body = func(*args)
+    cpu = (time.process_time() - start) / repeat
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<8} cpu={cpu * 1000:8.2f}ms  peak_alloc={peak / 1024:8.0f}KiB  body={len(body)} bytes")
+    return cpu, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = join(build_order_dataset(args.orders, args.items))
+    print(f"GET /orders body for {args.orders} orders x {args.items} items")
+    cpu_before, body_before = measure("before", before, data, args.repeat)
+    cpu_after, body_after = measure("after", after, data, args.repeat)
+    assert orjson.loads(body_before) == orjson.loads(body_after), "responses differ"
+    print(f"CPU per response reduced {cpu_before / cpu_after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+-- Apply Duitku payment callbacks to payments and orders in one transaction.
+--
+-- Called through PostgREST as POST /rest/v1/rpc/apply_payment_callbacks with
+-- {"callbacks": [...]}, one element per callback carrying the payments columns
+-- to write plus payment_id, reference and order_status. Each payment update and
+-- the matching order status update happen together; a callback whose payment
+-- does not exist is skipped and reported with a null order_id.
+--
+-- Callbacks are applied in array order. A settled payment (success or failed)
+-- keeps its status: a callback carrying a different status, such as a retried
+-- earlier "pending" delivery, leaves the payment and order untouched and is
+-- reported with applied = false.
+--
+-- Each callback runs in its own subtransaction: one that fails, for example
+-- on a value that cannot be cast to its column, is rolled back on its own and
+-- reported with the database error in `error`, while the rest of the batch is
+-- still applied.
+
+drop function if exists public.apply_payment_callbacks(jsonb);
+
+create function public.apply_payment_callbacks(callbacks jsonb)
+returns table (payment_id text, reference text, order_id bigint, applied boolean, error text)
+language plpgsql
+as $$
+declare
+    cb jsonb;
+    updated_order_id bigint;
+begin
+    for cb in select value from jsonb_array_elements(callbacks)
+    loop
+        updated_order_id := null;
+        applied := false;
+        error := null;
+
+        begin
+            update public.payments p
+               set (payment_method, payment_status, publisher_order_id, merchant_user_id,
+                    sp_user_hash, settlement_date, paid_at, issuer_code)
+                 = (r.payment_method, r.payment_status, r.publisher_order_id, r.merchant_user_id,
+                    r.sp_user_hash, r.settlement_date, r.paid_at, r.issuer_code)
+              from jsonb_populate_record(null::public.payments, cb) r
+             where p.payment_id = r.payment_id
+               and p.reference = r.reference
+               and (p.payment_status is null
+                    or p.payment_status not in ('success', 'failed')
+                    or p.payment_status = r.payment_status)
+            returning p.order_id into updated_order_id;
+
+            if updated_order_id is not null then
+                applied := true;
+            else
+                -- Report a payment that exists but is settled apart from one that does not.
+                select p.order_id into updated_order_id
+                  from public.payments p
+                 where p.payment_id = cb ->> 'payment_id'
+                   and p.reference = cb ->> 'reference';
+            end if;
+
+            if applied then
+                update public.orders o
+                   set status = r.status
+                  from jsonb_populate_record(
+                           null::public.orders,
+                           jsonb_build_object('status', cb -> 'order_status')
+                       ) r
+                 where o.order_id = updated_order_id;
+            end if;
+        exception when others then
+            updated_order_id := null;
+            applied := false;
+            error := sqlerrm;
+        end;
+
+        payment_id := cb ->> 'payment_id';
+        reference := cb ->> 'reference';
+        order_id := updated_order_id;
+        return next;
+    end loop;
+end;
+$$;
@@ -0,0 +1,14 @@
+-- Publish order changes to Supabase Realtime for the in-process order replica.
+--
+-- With ORDER_REPLICA_ENABLED each worker subscribes to postgres_changes on
+-- these tables (src/services/order_replica.py). Realtime only sends changes
+-- of tables in the supabase_realtime publication. REPLICA IDENTITY FULL makes
+-- deletes and updates carry the whole old row instead of just the primary
+-- key, which the replica needs to find the line item (order_id, sku) or
+-- product a delete refers to.
+
+alter publication supabase_realtime add table public.orders, public.order_details, public.master_products;
+
+alter table public.orders replica identity full;
+alter table public.order_details replica identity full;
+alter table public.master_products replica identity full;
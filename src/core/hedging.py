@@ -0,0 +1,143 @@
+import asyncio
+import collections
+import random
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+
+class LatencyWindow:
+    """
+    Recent latencies per operation, for picking a hedge delay from a percentile.
+
+    Percentiles are recomputed after every `refresh` new samples rather than on
+    every call, so asking for one on each read costs a dict lookup.
+    """
+
+    def __init__(self, size: int = 256, min_samples: int = 20, refresh: int = 16):
+        self.size = size
+        self.min_samples = min_samples
+        self.refresh = refresh
+        self._samples: Dict[str, Deque[float]] = {}
+        self._observed: Dict[str, int] = {}
+        self._percentiles: Dict[Tuple[str, float], Tuple[int, float]] = {}
+
+    def observe(self, key: str, latency: float):
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = collections.deque(maxlen=self.size)
+            self._observed[key] = 0
+        samples.append(latency)
+        self._observed[key] += 1
+
+    def percentile(self, key: str, percentile: float) -> Optional[float]:
+        """
+        The latency below which `percentile` percent of recent calls finished
+
+        Returns:
+            float: Seconds, or None until `min_samples` calls have been seen
+        """
+        samples = self._samples.get(key)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+        observed = self._observed[key]
+        cached = self._percentiles.get((key, percentile))
+        if cached is not None and observed - cached[0] < self.refresh:
+            return cached[1]
+        ordered = sorted(samples)
+        value = ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+        self._percentiles[(key, percentile)] = (observed, value)
+        return value
+
+
+class RetryBudget:
+    """
+    Cap extra attempts (hedges and retries) at a share of regular calls.
+
+    Every call deposits `ratio` tokens, up to `burst`; an extra attempt spends
+    one. When the backend is failing everywhere the budget runs dry, so retries
+    cannot multiply the load on it.
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: float = 10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+
+    def deposit(self):
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+async def hedge(call: Callable[[], Awaitable[Any]], delay: float, may_hedge: Callable[[], bool]):
+    """
+    Run `call()`, starting a second copy if the first has not finished after `delay`
+
+    The first copy to succeed wins and the other is cancelled. If one copy
+    fails, the other is still awaited; when both fail, the first one's error
+    is raised. Only use this for idempotent calls.
+
+    Args:
+        call (callable): Starts one attempt
+        delay (float): Seconds to wait before hedging
+        may_hedge (callable): Asked once the delay has passed; False skips the hedge
+
+    Returns:
+        tuple: The result, and whether the hedge (True) or the first attempt (False) produced it,
+        or None when no hedge was sent
+    """
+    # The first attempt runs inline in the caller's task, so a read that needs no
+    # hedge costs a timer and nothing else: no extra task and no extra trip
+    # through the event loop, which a busy loop would charge every read for.
+    # A hedge that succeeds first interrupts it by cancelling the caller's task.
+    loop = asyncio.get_running_loop()
+    caller = asyncio.current_task()
+    hedges: List[asyncio.Task] = []
+    settled = False
+
+    def on_hedge_done(second: asyncio.Task):
+        if not settled and not second.cancelled() and second.exception() is None:
+            caller.cancel()
+
+    def send_hedge():
+        if not settled and may_hedge():
+            second = loop.create_task(call())
+            second.add_done_callback(on_hedge_done)
+            hedges.append(second)
+
+    timer = loop.call_later(delay, send_hedge)
+    try:
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            # Ours only if nobody else cancelled the caller as well.
+            if hedges and hedges[0].done() and not hedges[0].cancelled() and caller.uncancel() == 0:
+                return hedges[0].result(), True
+            raise
+        except Exception:
+            # From here on the hedge is awaited, not raced.
+            settled = True
+            timer.cancel()
+            if not hedges:
+                raise
+            try:
+                return await hedges[0], True
+            except Exception:
+                pass
+            raise
+        return result, (False if hedges else None)
+    finally:
+        # The losing copy, or the hedge too if the caller went away.
+        settled = True
+        timer.cancel()
+        for task in hedges:
+            if not task.done():
+                task.cancel()
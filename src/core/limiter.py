@@ -0,0 +1,255 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextvars import ContextVar
+from typing import Dict
+from fastapi import HTTPException, status
+from .metrics import metrics
+
+# Lower values are served first when requests queue for a backend.
+PRIORITY_CRITICAL = 0
+PRIORITY_NORMAL = 1
+
+# How far an operation's latency baseline moves up towards each slower sample.
+BASELINE_DRIFT = 0.01
+
+request_priority: ContextVar[int] = ContextVar("request_priority", default=PRIORITY_NORMAL)
+request_started: ContextVar[float] = ContextVar("request_started", default=0.0)
+
+shed_requests = metrics.counter(
+    "load_shed_total", "Backend calls rejected instead of queued, by backend, reason and priority",
+    ["backend", "reason", "priority"],
+)
+
+
+def prioritize(priority: int):
+    """
+    Set the priority of the current request for every backend call it makes
+
+    Within a priority, calls of requests that started earlier go first, so
+    requests already part way through finish before new ones are admitted.
+
+    Args:
+        priority (int): PRIORITY_CRITICAL or PRIORITY_NORMAL
+    """
+    request_priority.set(priority)
+    request_started.set(time.monotonic())
+
+
+class Overloaded(HTTPException):
+    """A backend is saturated or failing; answered as 503 with Retry-After."""
+
+    def __init__(self, backend: str, reason: str, retry_after: float = 1.0):
+        self.backend = backend
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{backend} is overloaded ({reason}), retry later",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for one backend that adapts to its latency (AIMD).
+
+    A call is slow when it takes longer than `latency_target`, or longer than
+    `tolerance` times the baseline latency of its operation (a slowly rising
+    minimum), so queueing inside the backend shows up long before timeouts,
+    while a backend that got slower for good becomes the new baseline within
+    seconds. Each fast call while the limit is in use raises the limit by
+    1/limit, so it grows by about one per round of calls; a slow call or a
+    backend failure multiplies it by `backoff`, at most once per observed
+    latency so a burst of slow responses counts as one signal.
+
+    Calls over the limit wait for up to `queue_timeout` seconds in a queue of
+    at most `max_queue` entries, ordered by priority and then by when their
+    request started. A full queue rejects the call at once, unless it outranks
+    a queued call, which is rejected instead.
+    """
+
+    def __init__(self, name: str, initial_limit: int = 20, min_limit: int = 2, max_limit: int = 100,
+                 latency_target: float = 1.0, tolerance: float = 2.0, backoff: float = 0.9,
+                 max_queue: int = 50, queue_timeout: float = 0.5, retry_after: float = 1.0):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self._queue: list = []
+        self._queued = 0
+        self._sequence = itertools.count()
+        self._last_decrease = 0.0
+        self._baselines: Dict[str, float] = {}
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def saturated(self, priority: int = PRIORITY_NORMAL) -> bool:
+        """Whether a new request at this priority would be rejected without queueing."""
+        if self.in_flight < int(self.limit) and not self._queued:
+            return False
+        return self._queued >= self.max_queue and self._lowest_queued((priority, time.monotonic())) is None
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL, started: float = 0.0):
+        """
+        Take a slot, waiting in the queue when the limit is reached
+
+        Args:
+            priority (int): PRIORITY_CRITICAL calls are admitted ahead of PRIORITY_NORMAL ones
+            started (float, optional): time.monotonic() when the request began; earlier goes first
+
+        Raises:
+            Overloaded: The queue is full or the wait exceeded `queue_timeout`
+        """
+        if self.in_flight < int(self.limit) and not self._queued:
+            self.in_flight += 1
+            return
+
+        rank = (priority, started or time.monotonic())
+        if self._queued >= self.max_queue:
+            displaced = self._lowest_queued(rank)
+            if displaced is None:
+                self._reject("queue_full", priority)
+            displaced[3].set_exception(Overloaded(self.name, "displaced", self.retry_after))
+            shed_requests.inc(backend=self.name, reason="displaced", priority=displaced[0])
+            self._queued -= 1
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (*rank, next(self._sequence), waiter))
+        self._queued += 1
+        try:
+            # The slot is handed over by release() together with the result.
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if self._granted(waiter):
+                return
+            if not waiter.done():
+                waiter.cancel()
+                self._queued -= 1
+            self._reject("queue_timeout", priority)
+        except asyncio.CancelledError:
+            if self._granted(waiter):
+                self.release()
+            elif not waiter.done():
+                waiter.cancel()
+                self._queued -= 1
+            raise
+
+    @staticmethod
+    def _granted(waiter: asyncio.Future) -> bool:
+        return waiter.done() and not waiter.cancelled() and waiter.exception() is None
+
+    def release(self):
+        """Return a slot and hand it to the next queued call, if any."""
+        self.in_flight -= 1
+        while self._queue and self.in_flight < int(self.limit):
+            *_, waiter = heapq.heappop(self._queue)
+            if waiter.done():
+                continue
+            self._queued -= 1
+            # A waiter left behind by a closed event loop (tests, scripts) cannot be woken.
+            if waiter.get_loop() is not asyncio.get_running_loop():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def record(self, latency: float, failed: bool = False, operation: str = ""):
+        """
+        Adjust the limit from one finished call
+
+        Args:
+            latency (float): How long the call took, in seconds
+            failed (bool): The backend failed or timed out
+            operation (str, optional): What the call did; latency is compared with earlier calls of the same kind
+        """
+        now = time.monotonic()
+        baseline = self._baselines.get(operation, latency)
+        if not failed:
+            self._baselines[operation] = min(latency, baseline + (latency - baseline) * BASELINE_DRIFT)
+        if failed or latency > self.latency_target or latency > baseline * self.tolerance:
+            if now - self._last_decrease >= latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.in_flight >= self.limit / 2:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _lowest_queued(self, rank: tuple):
+        """The last queued call ranked below `rank`, if there is one."""
+        candidates = [entry for entry in self._queue if entry[:2] > rank and not entry[3].done()]
+        return max(candidates, key=lambda entry: entry[:3], default=None)
+
+    def _reject(self, reason: str, priority: int):
+        shed_requests.inc(backend=self.name, reason=reason, priority=priority)
+        raise Overloaded(self.name, reason, self.retry_after)
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "in_flight": self.in_flight, "queued": self._queued}
+
+
+class CircuitBreaker:
+    """
+    Stop calling a backend that keeps failing.
+
+    After `failure_threshold` consecutive failures the breaker opens and calls
+    fail at once for `reset_timeout` seconds. Then one probe call is let through
+    (half-open): success closes the breaker, failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 5.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def before_call(self, priority: int = PRIORITY_NORMAL):
+        """
+        Check that a call may go ahead
+
+        Raises:
+            Overloaded: The breaker is open, or half-open with its probe already running
+        """
+        if self.state == self.CLOSED:
+            return
+        remaining = self._opened_at + self.reset_timeout - time.monotonic()
+        if self.state == self.OPEN and remaining <= 0:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        shed_requests.inc(backend=self.name, reason="circuit_open", priority=priority)
+        raise Overloaded(self.name, "circuit_open", max(remaining, 1.0))
+
+    def abandon(self):
+        """Forget a call that before_call let through but that never reached the backend."""
+        self._probing = False
+
+    def record(self, failed: bool):
+        """Count the outcome of a call that before_call let through."""
+        self._probing = False
+        if not failed:
+            self.failures = 0
+            self.state = self.CLOSED
+            return
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {"circuit_open": int(self.state != self.CLOSED), "consecutive_failures": self.failures}
@@ -0,0 +1,74 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+from .config import configs
+
+# Attributes every LogRecord has; anything else was passed through `extra=`.
+_RECORD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_stream_handler: Optional[logging.Handler] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Render a log record as a single JSON line, including any `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue drained by a background thread.
+
+    Request handlers only enqueue records; formatting to JSON and writing to
+    stdout happen on the listener thread, so a slow stdout never blocks the
+    event loop. Calling it again returns the running listener.
+
+    Returns:
+        QueueListener: The started listener; stop it with `shutdown_logging()`.
+    """
+    global _listener, _stream_handler
+    if _listener is not None:
+        return _listener
+
+    log_queue = queue.SimpleQueue()
+    stream_handler = _stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(configs.log_level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the listener thread.
+
+    Records logged afterwards are written directly, so nothing piles up in a
+    queue nobody drains.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        logging.getLogger().handlers = [_stream_handler]
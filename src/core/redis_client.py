@@ -1,60 +1,201 @@
+import asyncio
 import json
-import redis
+import logging
+import time
+import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
 from .config import configs
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+redis_latency = metrics.histogram("redis_command_duration_seconds", "Redis command latency", ["command"])
+redis_errors = metrics.counter("redis_command_errors_total", "Redis commands that raised", ["command"])
+
+
+async def _timed(command: str, call):
+    start = time.perf_counter()
+    try:
+        return await call
+    except Exception:
+        redis_errors.inc(command=command)
+        raise
+    finally:
+        redis_latency.observe(time.perf_counter() - start, command=command)
+
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline that records one PIPELINE (or MULTI) observation per round trip"""
+
+    async def execute(self, raise_on_error: bool = True):
+        command = "MULTI" if self.is_transaction else "PIPELINE"
+        return await _timed(command, super().execute(raise_on_error))
+
+
+class InstrumentedRedis(redis.Redis):
+    """redis.Redis that times every command by name, including direct `.client` calls"""
+
+    async def execute_command(self, *args, **options):
+        return await _timed(str(args[0]).upper(), super().execute_command(*args, **options))
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+# One connection pool per worker, shared by every RedisClient.
+connection_pool = redis.ConnectionPool.from_url(
+    configs.redis_url,
+    max_connections=configs.redis_pool_max_connections,
+    socket_timeout=configs.redis_socket_timeout,
+    socket_connect_timeout=configs.redis_socket_connect_timeout,
+    health_check_interval=configs.redis_health_check_interval,
+)
 
 class RedisClient:
-    """Redis client for caching and data storage"""
-    
+    """Async Redis client for caching and data storage on the shared connection pool"""
+
     def __init__(self):
-        self.client = redis.from_url(configs.redis_url)
-    
-    def set(self, key: str, value: str, ex: int = None) -> bool:
+        self.client = InstrumentedRedis(connection_pool=connection_pool)
+
+    async def set(self, key: str, value: str, ex: int = None) -> bool:
         """
         Set a key-value pair in Redis
-        
+
         Args:
             key (str): The key to set
             value (str): The value to store
             ex (int, optional): Expiration time in seconds
-            
+
         Returns:
             bool: True if the operation was successful, False otherwise
         """
-        return self.client.set(key, value, ex=ex)
-    
-    def get(self, key: str) -> str:
+        return await self.client.set(key, value, ex=ex)
+
+    async def get(self, key: str) -> str:
         """
         Get a value by key from Redis
-        
+
         Args:
             key (str): The key to retrieve
-            
+
         Returns:
             str: The value associated with the key, or None if not found
         """
-        return self.client.get(key)
-    
-    def delete(self, key: str) -> bool:
+        return await self.client.get(key)
+
+    async def delete(self, key: str) -> bool:
         """
         Delete a key from Redis
-        
+
         Args:
             key (str): The key to delete
-            
+
         Returns:
             bool: True if the operation was successful, False otherwise
         """
-        return self.client.delete(key) > 0
-    
-    def publish(self, channel: str, message: str) -> bool:
+        return await self.client.delete(key) > 0
+
+    async def publish(self, channel: str, message: str) -> bool:
         """
         Publish a message to a Redis channel
-        
+
         Args:
             channel (str): The channel to publish to
             message (str): The message to publish
-            
+
         Returns:
             bool: True if the operation was successful, False otherwise
         """
-        return self.client.publish(channel, json.dumps(message)) > 0
\ No newline at end of file
+        return await self.client.publish(channel, json.dumps(message)) > 0
+
+    def pipeline(self, transaction: bool = False):
+        """
+        Queue several commands and send them to Redis in a single round trip
+
+            async with redis_client.pipeline() as pipe:
+                pipe.set(key, value, ex=60)
+                pipe.publish(channel, payload)
+                results = await pipe.execute()
+
+        Args:
+            transaction (bool, optional): Wrap the commands in MULTI/EXEC
+
+        Returns:
+            Pipeline: An async pipeline bound to the shared connection pool
+        """
+        return self.client.pipeline(transaction=transaction)
+
+    async def warm_up(self):
+        """Open a pooled connection ahead of the first request"""
+        await self.client.ping()
+
+    async def aclose(self):
+        """Disconnect every pooled connection"""
+        await connection_pool.disconnect()
+
+
+class RedisSubscriber:
+    """One pub/sub connection per worker that dispatches messages to registered handlers"""
+
+    def __init__(self, client: RedisClient):
+        self.client = client
+        self._handlers: dict = {}
+        self._pubsub = None
+        self._task = None
+
+    async def subscribe(self, channel: str, handler):
+        """
+        Call `handler` with every message published on `channel`
+
+        Args:
+            channel (str): The channel to subscribe to
+            handler (callable): Called on the event loop with each message dict
+        """
+        if self._pubsub is None:
+            self._pubsub = self.client.client.pubsub(ignore_subscribe_messages=True)
+        if channel not in self._handlers:
+            await self._pubsub.subscribe(channel)
+        self._handlers.setdefault(channel, []).append(handler)
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                # Poll with a timeout rather than listen(), which would trip the pool's socket timeout while idle.
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The next read reconnects and re-subscribes every channel.
+                logger.warning(f"Redis subscription interrupted, retrying: {e}")
+                await asyncio.sleep(1.0)
+
+    def _dispatch(self, message: dict):
+        channel = message.get("channel")
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(message)
+            except Exception as e:
+                logger.error(f"Redis handler for {channel} failed: {e}")
+
+    async def stop(self):
+        """Cancel the listener and close the pub/sub connection"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._handlers.clear()
+
+
+redis_client = RedisClient()
+redis_subscriber = RedisSubscriber(redis_client)
@@ -0,0 +1,54 @@
+from typing import Any, Optional
+import hashlib
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+def _default(obj: Any):
+    if isinstance(obj, BaseModel):
+        return orjson.Fragment(obj.__pydantic_serializer__.to_json(obj))
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response that serializes once, straight to bytes.
+
+    Pydantic models go through pydantic-core (`__pydantic_serializer__.to_json`),
+    everything else through orjson; `orjson.Fragment` values are embedded as
+    already-encoded JSON. Returning this from a route bypasses FastAPI's
+    response_model re-validation and `jsonable_encoder`, so keep `response_model`
+    on the route only to document the shape.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return orjson.dumps(content, default=_default)
+
+
+def strong_etag(*parts: Optional[bytes]) -> str:
+    """A strong ETag for a representation built from `parts` (None is hashed as empty)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part or b"")
+        # Separate the parts so moving bytes from one to the next changes the tag.
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches `etag`
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match, so a W/
+    prefix added by a proxy does not prevent a 304.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
@@ -0,0 +1,66 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from .metrics import metrics
+
+singleflight_calls = metrics.counter(
+    "singleflight_calls_total",
+    "Coalescable calls by group and whether they ran (leader), joined one in flight (shared) or bypassed a full map",
+    ["group", "result"],
+)
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one in-flight task.
+
+    The first caller for a key starts the call; callers arriving with the same
+    key while it runs await the same task and receive the same result or
+    exception, so returned values must be treated as read-only. The key is
+    forgotten as soon as the call finishes, so this never serves stale data:
+    it only deduplicates work that is already happening.
+
+    The call runs as its own task and waiters are shielded, so one caller being
+    cancelled does not cancel the call for the others. At most `max_pending`
+    keys are tracked; beyond that calls run uncoalesced.
+    """
+
+    def __init__(self, name: str, max_pending: int = 10000):
+        self.name = name
+        self.max_pending = max_pending
+        self._pending: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `func()` unless an identical call is already in flight, then share its outcome
+
+        Args:
+            key (Hashable): Identifies identical calls
+            func (callable): Starts the call; only invoked by the leading caller
+
+        Returns:
+            Any: The result of the shared call
+        """
+        task = self._pending.get(key)
+        # A task left behind by a closed event loop (tests, scripts) cannot be awaited here.
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            singleflight_calls.inc(group=self.name, result="shared")
+            return await asyncio.shield(task)
+
+        if len(self._pending) >= self.max_pending:
+            singleflight_calls.inc(group=self.name, result="bypass")
+            return await func()
+
+        singleflight_calls.inc(group=self.name, result="leader")
+        task = asyncio.ensure_future(func())
+        self._pending[key] = task
+        task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._pending.get(key) is task:
+            del self._pending[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every waiter has gone away.
+            task.exception()
@@ -1,14 +1,89 @@
-from supabase import create_client, Client
-from typing import Dict, List, Any, Optional
+from postgrest import AsyncPostgrestClient
+from postgrest.exceptions import APIError
+from postgrest.types import CountMethod, ReturnMethod
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Any, Optional, Tuple, Union
+import asyncio
+import collections
+import httpx
+import itertools
 import logging
 import os
+import time
 from .config import configs
+from .hedging import LatencyWindow, RetryBudget, backoff_delay, hedge
+from .limiter import AdaptiveLimiter, CircuitBreaker, request_priority, request_started
+from .metrics import metrics
+from .singleflight import SingleFlight
+if TYPE_CHECKING:
+    from supabase import Client
 # from dotenv import load_dotenv
 
 # load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+supabase_latency = metrics.histogram(
+    "supabase_request_duration_seconds", "PostgREST request latency", ["table", "operation"]
+)
+supabase_errors = metrics.counter(
+    "supabase_request_errors_total", "PostgREST requests that raised", ["table", "operation"]
+)
+supabase_reads = SingleFlight("supabase", max_pending=configs.singleflight_max_pending)
+supabase_read_hedges = metrics.counter(
+    "supabase_read_hedges_total", "Reads that sent a hedge request, by whether the hedge answered first",
+    ["table", "operation", "result"],
+)
+supabase_read_retries = metrics.counter(
+    "supabase_read_retries_total", "Reads retried after a transient backend error", ["table", "operation"]
+)
+supabase_read_latencies = LatencyWindow()
+supabase_read_budget = RetryBudget(ratio=configs.supabase_read_extra_ratio)
+supabase_limiter = AdaptiveLimiter(
+    "supabase",
+    initial_limit=configs.supabase_limiter_initial,
+    min_limit=configs.supabase_limiter_min,
+    max_limit=configs.supabase_limiter_max,
+    latency_target=configs.supabase_limiter_latency_target,
+    tolerance=configs.supabase_limiter_tolerance,
+    backoff=configs.supabase_limiter_backoff,
+    max_queue=configs.supabase_limiter_max_queue,
+    queue_timeout=configs.supabase_limiter_queue_timeout,
+    retry_after=configs.load_shed_retry_after,
+)
+supabase_breaker = CircuitBreaker(
+    "supabase",
+    failure_threshold=configs.supabase_breaker_failure_threshold,
+    reset_timeout=configs.supabase_breaker_reset_timeout,
+)
+
+# PostgREST codes for an unreachable or exhausted database, plus statement
+# timeouts and too many connections; other API errors are the caller's fault.
+BACKEND_FAILURE_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003", "57014", "53300"}
+
+
+def is_backend_failure(error: Exception) -> bool:
+    """Whether an error means Supabase itself is struggling, rather than a bad request."""
+    if isinstance(error, (httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, APIError):
+        # Responses without a JSON body (gateway errors) carry the HTTP status as the code.
+        return (isinstance(error.code, int) and error.code >= 500) or error.code in BACKEND_FAILURE_CODES
+    return False
+
+
+def _returning(query, columns: Optional[List[str]] = None):
+    """Limit the rows a write returns to `columns` (PostgREST `select` on a write)."""
+    if columns:
+        query.params = query.params.set("select", ",".join(columns))
+    return query
+
+
+def create_client(url: str, key: str) -> "Client":
+    # The full SDK (auth, storage, realtime) is only needed by the sync scripts
+    # client, so it is imported on first use instead of on every worker start.
+    from supabase import create_client as create_supabase_client
+    return create_supabase_client(url, key)
+
 class SupabaseConnection:
     """Manages connection and operations with Supabase database."""
     
@@ -21,7 +96,7 @@ class SupabaseConnection:
     
         """Initialize connection to Supabase."""
         try:
-            self.client : Client = create_client(
+            self.client : "Client" = create_client(
                 self.config["url"],
                 self.config["key"]
             )
@@ -55,7 +130,7 @@ class SupabaseConnection:
             .limit(1)
             .execute()
         )
-        print(response.data)
+        logger.debug(f"[SupabaseDB] max id response: {response.data}")
         if response.data and len(response.data) > 0:
             return int(response.data[0][id_column])
         else:
@@ -70,6 +145,9 @@ class SupabaseConnection:
         else:
             return 0
         
+    def _select(self, columns: Optional[List[str]] = None):
+        return self.client.table(self.table_name).select(*(columns or ["*"]))
+
     def insert(self, row: dict):
         logger.info(f"[SupabaseDB] inserting a single row: {row}")
         """Insert a single row."""
@@ -85,14 +163,14 @@ class SupabaseConnection:
         """Upsert rows using given conflict columns (must be unique/indexed)."""
         return self.client.table(self.table_name).upsert(rows, on_conflict=conflict_columns).execute()
 
-    def select_all(self, batch_size=1000):
+    def select_all(self, batch_size=1000, columns: Optional[List[str]] = None):
         logger.info(f"[SupabaseDB] select all")
         """Select all rows with optional batching."""
         all_rows = []
         offset = 0
 
         while True:
-            res = self.client.table(self.table_name).select("*").range(offset, offset + batch_size - 1).execute()
+            res = self._select(columns).range(offset, offset + batch_size - 1).execute()
             batch = res.data or []
             if not batch:
                 break
@@ -101,31 +179,54 @@ class SupabaseConnection:
 
         return all_rows
 
-    def select_where(self, conditions: dict, limit: int = None):
+    def select_where(self, conditions: dict, limit: int = None, columns: Optional[List[str]] = None):
         logger.info(f"[SupabaseDB] select where {conditions}")
-        """Select rows based on conditions (e.g., {'sku': 'abc'})."""
-        query = self.client.table(self.table_name).select("*")
+        """Select rows based on conditions (e.g., {'sku': 'abc'}), optionally only the given columns."""
+        query = self._select(columns)
         for col, val in conditions.items():
             query = query.eq(col, val)
         if limit:
             query = query.limit(limit)
         return query.execute().data
-    
-    def select_like(self, conditions: dict, limit: int = None):
+
+    def select_in(self, column: str, values: list, chunk_size: int = 500, columns: Optional[List[str]] = None):
+        logger.info(f"[SupabaseDB] select in {column} ({len(values)} values)")
+        """Select rows whose column matches any of the given values (e.g., 'sku', ['abc', 'def']).
+
+        Values are de-duplicated and sent as `in` filters, one request per chunk of
+        `chunk_size` values to keep the query string within URL length limits.
+        """
+        unique_values = list(dict.fromkeys(v for v in values if v is not None))
+        rows = []
+        for start in range(0, len(unique_values), chunk_size):
+            chunk = unique_values[start:start + chunk_size]
+            res = self._select(columns).in_(column, chunk).execute()
+            rows.extend(res.data or [])
+        return rows
+
+    def select_after(self, column: str, after: Any = None, limit: int = 1000, columns: Optional[List[str]] = None):
+        logger.info(f"[SupabaseDB] select after {column} > {after} (limit {limit})")
+        """Select the next page of rows ordered by column, starting after the cursor value (keyset pagination)."""
+        query = self._select(columns).order(column).limit(limit)
+        if after is not None:
+            query = query.gt(column, after)
+        return query.execute().data
+
+    def select_like(self, conditions: dict, limit: int = None, columns: Optional[List[str]] = None):
         logger.info(f"[SupabaseDB] select like {conditions}")
         # """Select rows based on conditions with LIKE (e.g., {'sku': 'abc%'}). lowercase."""
         conditions = {k: v.lower() for k, v in conditions.items()}
-        query = self.client.table(self.table_name).select("*")
+        query = self._select(columns)
         for col, val in conditions.items():
             query = query.ilike(col, val)
         if limit:
             query = query.limit(limit)
         return query.execute().data
     
-    def select_with_limit(self, limit: int = 1000):
+    def select_with_limit(self, limit: int = 1000, columns: Optional[List[str]] = None):
         logger.info(f"[SupabaseDB] select with limit {limit}")
         """Select rows with a limit."""
-        query = self.client.table(self.table_name).select("*").limit(limit)
+        query = self._select(columns).limit(limit)
         return query.execute().data
 
     def select_columns_with_conditions_and_batch(self, columns: List[str], batch_size: int = 1000, conditions: Optional[Dict[str, Any]] = None):
@@ -135,7 +236,10 @@ class SupabaseConnection:
         offset = 0
 
         while True:
-            res = self.client.table(self.table_name).select(', '.join(columns)).range(offset, offset + batch_size - 1).execute()
+            query = self.client.table(self.table_name).select(', '.join(columns))
+            for col, val in (conditions or {}).items():
+                query = query.eq(col, val)
+            res = query.range(offset, offset + batch_size - 1).execute()
             batch = res.data or []
             if not batch:
                 break
@@ -144,6 +248,11 @@ class SupabaseConnection:
 
         return all_rows
     
+    def rpc(self, name: str, params: Optional[dict] = None):
+        logger.info(f"[SupabaseDB] rpc {name}")
+        """Call a Postgres function exposed by PostgREST and return its result."""
+        return self.client.rpc(name, params or {}).execute().data
+
     def delete_where(self, conditions: dict):
         logger.info(f"[SupabaseDB] delete where {conditions}")
         """Delete rows based on conditions."""
@@ -152,18 +261,512 @@ class SupabaseConnection:
             query = query.eq(col, val)
         return query.execute()
 
-    def update_where(self, conditions: dict, new_values: dict):
+    def update_where(self, conditions: dict, new_values: dict, returning: str = "representation", columns: Optional[List[str]] = None):
         logger.info(f"[SupabaseDB] update where {conditions}")
-        """Update specific rows matching conditions with new values."""
-        query = self.client.table(self.table_name).update(new_values)
+        """Update specific rows matching conditions with new values.
+
+        Pass returning="minimal" when the updated rows are not needed, or `columns`
+        to get back only those columns of them.
+        """
+        query = _returning(self.client.table(self.table_name).update(new_values, returning=ReturnMethod(returning)), columns)
         for col, val in conditions.items():
             query = query.eq(col, val)
         return query.execute()
 
+    def update_in(self, column: str, values: list, new_values: dict, chunk_size: int = 500, returning: str = "representation", columns: Optional[List[str]] = None):
+        logger.info(f"[SupabaseDB] update in {column} ({len(values)} values)")
+        """Set the same new values on every row whose column matches one of the given values.
+
+        Sent as `in`-filtered PATCH requests, one per chunk of `chunk_size` values.
+        Returns the updated rows; values without a matching row are simply absent.
+        See update_where for `returning` and `columns`.
+        """
+        unique_values = list(dict.fromkeys(v for v in values if v is not None))
+        rows = []
+        for start in range(0, len(unique_values), chunk_size):
+            chunk = unique_values[start:start + chunk_size]
+            query = self.client.table(self.table_name).update(new_values, returning=ReturnMethod(returning))
+            res = _returning(query, columns).in_(column, chunk).execute()
+            rows.extend(res.data or [])
+        return rows
+
+
+class SupabaseClientRegistry:
+    """Process-wide registry of pooled PostgREST clients.
+
+    Every AsyncSupabaseConnection pointing at the same Supabase project shares one
+    AsyncPostgrestClient and therefore one httpx connection pool, so table handles
+    reuse keep-alive (HTTP/2 when available) connections instead of each opening
+    their own. Pool limits and timeouts come from Settings.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, str], AsyncPostgrestClient] = {}
+        self._stats = {"requests": 0, "connections_opened": 0, "tls_handshakes": 0}
+
+    def get_client(self, url: str, key: str) -> AsyncPostgrestClient:
+        """Return the shared client for a project, creating it on first use."""
+        client = self._clients.get((url, key))
+        if client is None:
+            client = AsyncPostgrestClient(
+                f"{url}/rest/v1",
+                headers={
+                    "apiKey": key,
+                    "Authorization": f"Bearer {key}",
+                },
+                http_client=self._create_http_client(),
+            )
+            self._clients[(url, key)] = client
+            logger.info("Connected to Supabase successfully")
+        return client
+
+    def _create_http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=configs.supabase_http2,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=configs.supabase_pool_max_connections,
+                max_keepalive_connections=configs.supabase_pool_max_keepalive,
+                keepalive_expiry=configs.supabase_pool_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                connect=configs.supabase_connect_timeout,
+                read=configs.supabase_read_timeout,
+                write=configs.supabase_write_timeout,
+                pool=configs.supabase_pool_timeout,
+            ),
+            event_hooks={"request": [self._on_request]},
+        )
+
+    async def _on_request(self, request: httpx.Request):
+        self._stats["requests"] += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            self._stats["connections_opened"] += 1
+        elif event_name == "connection.start_tls.complete":
+            self._stats["tls_handshakes"] += 1
+
+    def pool_stats(self) -> dict:
+        """
+        Snapshot of the shared connection pools.
+
+        Returns:
+            dict: Request and handshake counters plus the number of open, idle
+            and HTTP/2 connections across all pools.
+        """
+        stats = {**self._stats, "clients": len(self._clients), "open": 0, "idle": 0, "http2": 0}
+        for client in self._clients.values():
+            pool = getattr(client.session._transport, "_pool", None)
+            for connection in getattr(pool, "connections", []):
+                stats["open"] += 1
+                stats["idle"] += connection.is_idle()
+                stats["http2"] += "HTTP/2" in connection.info()
+        return stats
+
+    async def reconnect(self, url: str, key: str) -> AsyncPostgrestClient:
+        """Replace the shared client for a project with a new one and close the old one's pool."""
+        old = self._clients.pop((url, key), None)
+        client = self.get_client(url, key)
+        if old is not None:
+            await old.aclose()
+        return client
+
+    async def aclose(self):
+        """Close every pooled connection."""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+
+supabase_clients = SupabaseClientRegistry()
+
+supabase_pool = metrics.gauge("supabase_pool", "Shared PostgREST connection pool state", ["stat"])
+supabase_load = metrics.gauge(
+    "supabase_load", "Adaptive concurrency limit, calls in flight and queued, and circuit breaker state", ["stat"]
+)
+
+
+def _collect_pool_stats():
+    for stat, value in supabase_clients.pool_stats().items():
+        supabase_pool.set(value, stat=stat)
+    for stat, value in {**supabase_limiter.stats(), **supabase_breaker.stats()}.items():
+        supabase_load.set(value, stat=stat)
+
+
+metrics.add_collector(_collect_pool_stats)
+
+
+class AsyncSupabaseConnection:
+    """Non-blocking counterpart of SupabaseConnection built on the async PostgREST client.
+
+    Exposes the same operations as SupabaseConnection as coroutines, so request
+    handlers can await database calls without stalling the event loop.
+    """
+
+    def __init__(self, table_name: Optional[str] = None, primary_key: Optional[List[str]] = None):
+        self.config = {
+            "url": configs.supabase_url,
+            "key": configs.supabase_key
+        }
+        self.table_name: str = table_name
+        # Columns that identify a row; bulk reads page in this order by default.
+        self.primary_key: List[str] = primary_key or ["id"]
+        self._client: Optional[AsyncPostgrestClient] = None
+
+    @property
+    def client(self) -> AsyncPostgrestClient:
+        """
+        The shared PostgREST client, created on first use rather than at import.
+
+        Looked up in `supabase_clients` on every use, so all handles move to a
+        new client together after `connect`, unless one was assigned explicitly.
+        """
+        if self._client is not None:
+            return self._client
+        try:
+            return self._create_client()
+        except Exception as e:
+            logger.error(f"Failed to connect to Supabase: {e}")
+            raise
+
+    @client.setter
+    def client(self, client: AsyncPostgrestClient):
+        self._client = client
+
+    def _create_client(self) -> AsyncPostgrestClient:
+        return supabase_clients.get_client(self.config["url"], self.config["key"])
+
+    async def warm_up(self):
+        """Create the client and open a pooled connection ahead of the first request."""
+        await self._execute("warm_up", self.table().select("*", head=True).limit(1))
+
+    async def connect(self, table_name: Optional[str] = None):
+        """Reconnect to Supabase, replacing the shared client of every handle and closing the old pool."""
+        try:
+            await supabase_clients.reconnect(self.config["url"], self.config["key"])
+            self._client = None
+            if table_name:
+                self.table_name = table_name
+            logger.info("Reconnected to Supabase successfully")
+        except Exception as e:
+            logger.error(f"Failed to reconnect to Supabase: {e}")
+            raise
+
+    def table(self):
+        return self.client.from_(self.table_name)
+
+    def _select(self, columns: Optional[List[str]] = None):
+        return self.table().select(*(columns or ["*"]))
+
+    async def _execute(self, operation: str, query, table: Optional[str] = None):
+        """
+        Run a PostgREST request, recording its latency per table and operation.
+
+        Requests pass the circuit breaker and take a slot from the adaptive
+        concurrency limiter first, in the priority of the current request;
+        both raise Overloaded instead of piling more work on a struggling database.
+        """
+        table = table or self.table_name
+        if not configs.supabase_limiter_enabled:
+            start = time.perf_counter()
+            try:
+                return await query.execute()
+            except Exception:
+                supabase_errors.inc(table=table, operation=operation)
+                raise
+            finally:
+                supabase_latency.observe(time.perf_counter() - start, table=table, operation=operation)
+
+        priority = request_priority.get()
+        supabase_breaker.before_call(priority)
+        try:
+            await supabase_limiter.acquire(priority, request_started.get())
+        except BaseException:
+            supabase_breaker.abandon()
+            raise
+
+        failed = None
+        start = time.perf_counter()
+        try:
+            response = await query.execute()
+            failed = False
+            return response
+        except Exception as e:
+            supabase_errors.inc(table=table, operation=operation)
+            failed = is_backend_failure(e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            supabase_latency.observe(elapsed, table=table, operation=operation)
+            supabase_limiter.release()
+            if failed is None:
+                # Cancelled before the database answered.
+                supabase_breaker.abandon()
+            else:
+                supabase_breaker.record(failed)
+                supabase_limiter.record(elapsed, failed, f"{table}.{operation}")
+
+    async def _read(self, operation: str, query):
+        """Run a read, sharing the response with identical reads already in flight."""
+        if not configs.singleflight_enabled:
+            return await self._read_with_retries(operation, query)
+        key = (self.table_name, query.http_method, query.path, str(query.params), query.headers.get("prefer"))
+        return await supabase_reads.do(key, lambda: self._read_with_retries(operation, query))
+
+    async def _read_with_retries(self, operation: str, query):
+        """
+        Run an idempotent read, retrying transient backend errors with jittered backoff.
+
+        Retries and hedges share `supabase_read_budget`, so together they add at
+        most `supabase_read_extra_ratio` extra requests per read.
+        """
+        supabase_read_budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                return await self._read_once(operation, query)
+            except Exception as e:
+                if attempt >= configs.supabase_read_retries or not is_backend_failure(e) or not supabase_read_budget.try_spend():
+                    raise
+                supabase_read_retries.inc(table=self.table_name, operation=operation)
+                logger.debug(f"[SupabaseDB] retrying {operation} on {self.table_name} after: {e}")
+                await asyncio.sleep(backoff_delay(attempt, configs.supabase_retry_backoff, configs.supabase_retry_backoff_max))
+                attempt += 1
+
+    async def _read_once(self, operation: str, query):
+        """One read attempt, hedged with a second request once it is slower than usual."""
+        key = f"{self.table_name}.{operation}"
+
+        async def attempt():
+            start = time.perf_counter()
+            response = await self._execute(operation, query)
+            supabase_read_latencies.observe(key, time.perf_counter() - start)
+            return response
+
+        if not configs.supabase_hedge_enabled or operation not in configs.supabase_hedge_operations:
+            return await attempt()
+
+        delay = supabase_read_latencies.percentile(key, configs.supabase_hedge_percentile)
+        delay = max(configs.supabase_hedge_min_delay, delay if delay is not None else configs.supabase_hedge_default_delay)
+        response, hedge_won = await hedge(attempt, delay, self._may_hedge)
+        if hedge_won is not None:
+            supabase_read_hedges.inc(table=self.table_name, operation=operation, result="won" if hedge_won else "lost")
+        return response
+
+    @staticmethod
+    def _may_hedge() -> bool:
+        # Hedging only helps when the slowness is one unlucky request, not a backend that is already queueing.
+        if configs.supabase_limiter_enabled and (supabase_limiter.queued or supabase_limiter.in_flight >= int(supabase_limiter.limit)):
+            return False
+        return supabase_read_budget.try_spend()
+
+    @staticmethod
+    def _filter(query, conditions: Optional[Dict[str, Any]]):
+        for col, val in (conditions or {}).items():
+            query = query.eq(col, val)
+        return query
+
+    async def get_max_id(self, id_column: str = 'id') -> int:
+        logger.info("[SupabaseDB] getting max id")
+        """Get the maximum value of the specified ID column."""
+        response = await self._read(
+            "get_max_id",
+            self.table()
+            .select(id_column)
+            .order(id_column, desc=True)
+            .limit(1)
+        )
+        if response.data and len(response.data) > 0:
+            return int(response.data[0][id_column])
+        else:
+            raise ValueError("No data found in the table.")
+
+    async def get_count_rows(self) -> int:
+        logger.info("[SupabaseDB] getting count of rows")
+        """Get the total number of rows in the table."""
+        response = await self._read("get_count_rows", self.table().select("count"))
+        if response.data and len(response.data) > 0:
+            return int(response.data[0]['count'])
+        else:
+            return 0
+
+    async def insert(self, row: dict):
+        logger.info(f"[SupabaseDB] inserting a single row: {row}")
+        """Insert a single row."""
+        return await self._execute("insert", self.table().insert(row))
+
+    async def insert_many(self, rows: list[dict]):
+        logger.info(f"[SupabaseDB] inserting multiple rows ({len(rows)} data)")
+        """Insert multiple rows."""
+        return await self._execute("insert_many", self.table().insert(rows))
+
+    async def upsert(self, rows: list[dict], conflict_columns: list[str]):
+        logger.info(f"[SupabaseDB] upserting multiple rows ({len(rows)} data)")
+        """Upsert rows using given conflict columns (must be unique/indexed)."""
+        return await self._execute("upsert", self.table().upsert(rows, on_conflict=",".join(conflict_columns)))
+
+    async def select_all(self, batch_size=1000, columns: Optional[List[str]] = None, order_by: Optional[List[str]] = None):
+        logger.info(f"[SupabaseDB] select all")
+        """Select all rows with optional batching, ordered by `order_by` (default: the primary key)."""
+        return [row async for row in self.iter_rows(columns, batch_size=batch_size, order_by=order_by)]
+
+    async def count_where(self, conditions: Optional[Dict[str, Any]] = None) -> int:
+        logger.info(f"[SupabaseDB] count where {conditions}")
+        """Count rows matching conditions without transferring them."""
+        query = self._filter(self.table().select("*", count=CountMethod.exact, head=True), conditions)
+        return (await self._read("count_where", query)).count or 0
+
+    async def iter_rows(
+        self,
+        columns: Optional[List[str]] = None,
+        conditions: Optional[Dict[str, Any]] = None,
+        batch_size: int = 1000,
+        concurrency: Optional[int] = None,
+        order_by: Optional[Union[str, List[str]]] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[dict]:
+        """Yield every row matching conditions, fetching several pages at once.
+
+        Counts the matching rows first, then keeps up to `concurrency` page
+        requests in flight and yields rows page by page in order, so at most
+        `concurrency` pages are held in memory. Conditions are applied server-side.
+        Pages are OFFSET ranges, which only split the rows into disjoint, complete
+        pages under a unique ordering, so rows are ordered by `order_by` (a column
+        or columns that identify a row), or by the primary key when it is not
+        given. Rows added after the count are not returned.
+        `descending` with `limit` reads only the newest rows.
+        """
+        logger.info(f"[SupabaseDB] iter rows where {conditions}")
+        total = await self.count_where(conditions)
+        if limit is not None:
+            total = min(total, limit)
+        concurrency = concurrency or configs.supabase_bulk_read_concurrency
+        offsets = iter(range(0, total, batch_size))
+        select = ", ".join(columns) if columns else "*"
+        order_by = [order_by] if isinstance(order_by, str) else order_by or self.primary_key
+
+        def fetch_page(offset: int) -> asyncio.Task:
+            query = self._filter(self.table().select(select), conditions)
+            for column in order_by:
+                query = query.order(column, desc=descending)
+            end = min(offset + batch_size, total) - 1
+            return asyncio.ensure_future(self._read("iter_rows", query.range(offset, end)))
+
+        pending = collections.deque(fetch_page(offset) for offset in itertools.islice(offsets, concurrency))
+        try:
+            while pending:
+                res = await pending.popleft()
+                next_offset = next(offsets, None)
+                if next_offset is not None:
+                    pending.append(fetch_page(next_offset))
+                for row in res.data or []:
+                    yield row
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def select_where(self, conditions: dict, limit: int = None, columns: Optional[List[str]] = None):
+        logger.info(f"[SupabaseDB] select where {conditions}")
+        """Select rows based on conditions (e.g., {'sku': 'abc'}), optionally only the given columns."""
+        query = self._select(columns)
+        for col, val in conditions.items():
+            query = query.eq(col, val)
+        if limit:
+            query = query.limit(limit)
+        return (await self._read("select_where", query)).data
+
+    async def select_in(self, column: str, values: list, chunk_size: int = 500, columns: Optional[List[str]] = None):
+        logger.info(f"[SupabaseDB] select in {column} ({len(values)} values)")
+        """Select rows whose column matches any of the given values (e.g., 'sku', ['abc', 'def']).
+
+        Chunks are requested concurrently; see SupabaseConnection.select_in.
+        """
+        unique_values = list(dict.fromkeys(v for v in values if v is not None))
+        chunks = [unique_values[start:start + chunk_size] for start in range(0, len(unique_values), chunk_size)]
+        responses = await asyncio.gather(
+            *(self._read("select_in", self._select(columns).in_(column, chunk)) for chunk in chunks)
+        )
+        return [row for res in responses for row in (res.data or [])]
+
+    async def select_after(self, column: str, after: Any = None, limit: int = 1000, columns: Optional[List[str]] = None):
+        logger.info(f"[SupabaseDB] select after {column} > {after} (limit {limit})")
+        """Select the next page of rows ordered by column, starting after the cursor value (keyset pagination)."""
+        query = self._select(columns).order(column).limit(limit)
+        if after is not None:
+            query = query.gt(column, after)
+        return (await self._read("select_after", query)).data
+
+    async def select_like(self, conditions: dict, limit: int = None, columns: Optional[List[str]] = None):
+        logger.info(f"[SupabaseDB] select like {conditions}")
+        conditions = {k: v.lower() for k, v in conditions.items()}
+        query = self._select(columns)
+        for col, val in conditions.items():
+            query = query.ilike(col, val)
+        if limit:
+            query = query.limit(limit)
+        return (await self._read("select_like", query)).data
+
+    async def select_with_limit(self, limit: int = 1000, columns: Optional[List[str]] = None):
+        logger.info(f"[SupabaseDB] select with limit {limit}")
+        """Select rows with a limit."""
+        return (await self._read("select_with_limit", self._select(columns).limit(limit))).data
+
+    async def select_columns_with_conditions_and_batch(self, columns: List[str], batch_size: int = 1000, conditions: Optional[Dict[str, Any]] = None, order_by: Optional[List[str]] = None):
+        logger.info(f"[SupabaseDB] select columns {columns} where {conditions}")
+        """Select the given columns of all rows matching conditions, fetched in concurrent batches ordered by `order_by` (default: the primary key)."""
+        return [row async for row in self.iter_rows(columns, conditions, batch_size=batch_size, order_by=order_by)]
+
+    async def rpc(self, name: str, params: Optional[dict] = None):
+        logger.info(f"[SupabaseDB] rpc {name}")
+        """Call a Postgres function exposed by PostgREST and return its result.
+
+        A single call runs in one database transaction, which makes it the way to
+        apply several dependent writes atomically in one round trip.
+        """
+        return (await self._execute("rpc", self.client.rpc(name, params or {}), table=name)).data
+
+    async def delete_where(self, conditions: dict):
+        logger.info(f"[SupabaseDB] delete where {conditions}")
+        """Delete rows based on conditions."""
+        query = self.table().delete()
+        for col, val in conditions.items():
+            query = query.eq(col, val)
+        return await self._execute("delete_where", query)
+
+    async def update_where(self, conditions: dict, new_values: dict, returning: str = "representation", columns: Optional[List[str]] = None):
+        logger.info(f"[SupabaseDB] update where {conditions}")
+        """Update specific rows matching conditions with new values.
+
+        See SupabaseConnection.update_where for `returning` and `columns`.
+        """
+        query = _returning(self.table().update(new_values, returning=ReturnMethod(returning)), columns)
+        for col, val in conditions.items():
+            query = query.eq(col, val)
+        return await self._execute("update_where", query)
+
+    async def update_in(self, column: str, values: list, new_values: dict, chunk_size: int = 500, returning: str = "representation", columns: Optional[List[str]] = None):
+        logger.info(f"[SupabaseDB] update in {column} ({len(values)} values)")
+        """Set the same new values on every row whose column matches one of the given values.
+
+        Chunks are sent concurrently; see SupabaseConnection.update_in.
+        """
+        unique_values = list(dict.fromkeys(v for v in values if v is not None))
+        chunks = [unique_values[start:start + chunk_size] for start in range(0, len(unique_values), chunk_size)]
+        responses = await asyncio.gather(
+            *(
+                self._execute("update_in", _returning(self.table().update(new_values, returning=ReturnMethod(returning)), columns).in_(column, chunk))
+                for chunk in chunks
+            )
+        )
+        return [row for res in responses for row in (res.data or [])]
+
 # Global instance
-supabase_db = SupabaseConnection()
-supabase_products = SupabaseConnection(table_name="master_products")
-supabase_cart = SupabaseConnection(table_name="cart")
-supabase_orders = SupabaseConnection(table_name="orders")
-supabase_orders_details = SupabaseConnection(table_name="order_details")
-supabase_payments = SupabaseConnection(table_name="payments")
\ No newline at end of file
+supabase_db = AsyncSupabaseConnection()
+supabase_products = AsyncSupabaseConnection(table_name="master_products", primary_key=["sku"])
+supabase_cart = AsyncSupabaseConnection(table_name="cart")
+supabase_orders = AsyncSupabaseConnection(table_name="orders", primary_key=["order_id"])
+supabase_orders_details = AsyncSupabaseConnection(table_name="order_details", primary_key=["order_id", "sku"])
+supabase_payments = AsyncSupabaseConnection(table_name="payments", primary_key=["payment_id"])
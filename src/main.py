@@ -1,15 +1,58 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from typing import Union, List
 
 from fastapi import FastAPI
 
 from src.core.config import configs
+from src.core.log import setup_logging, shutdown_logging
+from src.core.redis_client import redis_client, redis_subscriber
+from src.core.supabase_connection import supabase_clients, supabase_orders
+from src.services.callback_worker import callback_stream_worker
+from src.services.order import order_replica
+from src.services.payment_events import payment_event_broker
+from src.services.product import ProductService
 from src.utils import singleton
-from src.routes import callback, order
+from src.routes import callback, metrics, order
 from src.middleware import register_middleware
 
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+async def warm_up():
+    """Open Supabase and Redis connections before the first request instead of during it."""
+    results = await asyncio.gather(supabase_orders.warm_up(), redis_client.warm_up(), return_exceptions=True)
+    for name, result in zip(("Supabase", "Redis"), results):
+        if isinstance(result, Exception):
+            logger.warning(f"{name} warm-up failed, connecting on first use instead: {result}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    if configs.warm_up_clients:
+        await warm_up()
+    await ProductService().subscribe_invalidations()
+    try:
+        await payment_event_broker.start()
+    except Exception as e:
+        # Streams retry the subscription when the first client connects.
+        logger.warning(f"Payment status events unavailable, Redis unreachable: {e}")
+    if configs.callback_queue_enabled:
+        await callback_stream_worker.start()
+    if configs.order_replica_enabled:
+        await order_replica.start()
+    yield
+    await order_replica.stop()
+    await callback_stream_worker.stop()
+    await redis_subscriber.stop()
+    await redis_client.aclose()
+    await supabase_clients.aclose()
+    shutdown_logging()
+
 
-    
-    
 @singleton
 class AppCreator:
     def __init__(self):
@@ -18,6 +61,7 @@ class AppCreator:
             title=configs.PROJECT_NAME,
             openapi_url=f"{configs.API}/openapi.json",
             version=configs.VERSION,
+            lifespan=lifespan,
         )
 
         
@@ -29,6 +73,9 @@ class AppCreator:
         self.app.include_router(
             order.order_router, prefix="/orders", tags=["orders"]
         )
+        self.app.include_router(
+            metrics.metrics_router, prefix="/metrics", tags=["metrics"]
+        )
 
 app_creator = AppCreator()
 app = app_creator.app
\ No newline at end of file
@@ -3,25 +3,78 @@ from fastapi.requests import Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from src.core.config import configs
+from src.core.limiter import PRIORITY_CRITICAL, PRIORITY_NORMAL, Overloaded, prioritize, shed_requests
+from src.core.metrics import metrics
+from src.core.supabase_connection import supabase_limiter
+import random
 import time
 import logging
 
-logger = logging.getLogger("uvicorn.access")
-logger.disabled = True
+logging.getLogger("uvicorn.access").disabled = True
+access_logger = logging.getLogger("src.access")
+
+request_latency = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ["method", "route", "status"]
+)
+
+
+async def shed_load(request: Request, call_next):
+    """
+    Run the request in its priority, answering 503 at once when Supabase cannot take it.
+
+    Callbacks (`load_shed_priority_paths`) outrank everything else for database
+    slots, and requests already in progress outrank new ones. Other requests are turned away before routing while the Supabase
+    queue is full, instead of joining it and timing out.
+    """
+    path = request.url.path
+    priority = PRIORITY_CRITICAL if path.startswith(tuple(configs.load_shed_priority_paths)) else PRIORITY_NORMAL
+    prioritize(priority)
+
+    if configs.supabase_limiter_enabled and path != "/metrics" and supabase_limiter.saturated(priority):
+        shed_requests.inc(backend=supabase_limiter.name, reason="queue_full", priority=priority)
+        overloaded = Overloaded(supabase_limiter.name, "queue_full", supabase_limiter.retry_after)
+        return JSONResponse(
+            status_code=overloaded.status_code,
+            content={"detail": overloaded.detail},
+            headers=overloaded.headers,
+        )
+    return await call_next(request)
 
 
 def register_middleware(app: FastAPI):
 
     @app.middleware("http")
     async def custom_logging(request: Request, call_next):
-        start_time = time.time()
+        start_time = time.perf_counter()
+
+        response = await shed_load(request, call_next)
+        processing_time = time.perf_counter() - start_time
 
-        response = await call_next(request)
-        processing_time = time.time() - start_time
+        # Label by route template (/orders/{id}), not the raw path, to bound cardinality.
+        route = request.scope.get("route")
+        request_latency.observe(
+            processing_time,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=response.status_code,
+        )
 
-        message = f"{request.client.host}:{request.client.port} - {request.method} - {request.url.path} - {response.status_code} completed after {processing_time}s"
+        # Errors are always logged; successful requests only at the sample rate.
+        if response.status_code < 400 and random.random() >= configs.access_log_success_sample_rate:
+            return response
 
-        print(message)
+        client = f"{request.client.host}:{request.client.port}" if request.client else None
+        access_logger.info(
+            f"{request.method} {request.url.path} {response.status_code}",
+            extra={
+                "client": client,
+                "method": request.method,
+                "path": request.url.path,
+                "status": response.status_code,
+                "duration_ms": round(processing_time * 1000, 3),
+            },
+        )
         return response
 
     app.add_middleware(
@@ -0,0 +1,100 @@
+"""
+Report where worker startup time goes.
+
+Imports `src.main` in a fresh interpreter with `-X importtime` and lists the
+slowest modules, then times the import and the lifespan startup in this process.
+With --budget-ms it exits non-zero when importing `src.main` takes longer, so the
+check can run in CI.
+
+Usage:
+    python -m src.profile_startup [--top 25] [--budget-ms 1000] [--warm-up]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """
+    Import `module` in a fresh interpreter and collect `-X importtime` output
+
+    Args:
+        module (str): The module to import
+
+    Returns:
+        list: (module name, self µs, cumulative µs) per imported module
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=os.environ,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def by_package(rows: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    totals: Dict[str, int] = {}
+    for name, self_us, _ in rows:
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+
+async def time_lifespan(app) -> float:
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter() - start
+    return ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=20, help="modules to list")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail when importing src.main takes longer")
+    parser.add_argument("--warm-up", action="store_true", help="open Supabase and Redis connections during startup")
+    args = parser.parse_args()
+
+    rows = import_times("src.main")
+    total_ms = next(cumulative for name, _, cumulative in rows if name == "src.main") / 1000
+
+    print(f"Import src.main: {total_ms:.1f}ms across {len(rows)} modules\n")
+    print(f"{'self ms':>9} {'cumulative ms':>14}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>9.1f} {cumulative_us / 1000:>14.1f}  {name}")
+
+    print(f"\n{'self ms':>9}  package")
+    for package, self_us in sorted(by_package(rows).items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>9.1f}  {package}")
+
+    print(f"\n{'ms':>9}  application module (cumulative)")
+    for name, _, cumulative_us in sorted((row for row in rows if row[0].startswith("src")), key=lambda row: row[2], reverse=True):
+        print(f"{cumulative_us / 1000:>9.1f}  {name}")
+
+    if args.warm_up:
+        os.environ["WARM_UP_CLIENTS"] = "true"
+    start = time.perf_counter()
+    from src.main import app
+    imported = time.perf_counter() - start
+    started = asyncio.run(time_lifespan(app))
+    print(f"\nIn-process: import {imported * 1000:.1f}ms, lifespan startup {started * 1000:.1f}ms, "
+          f"ready after {(imported + started) * 1000:.1f}ms")
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"Import time {total_ms:.1f}ms is over the {args.budget_ms:.0f}ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,26 @@
+import logging
 from typing import List, Union, Dict
 from fastapi import APIRouter, status, Depends, Request
 from fastapi.exceptions import HTTPException
+from fastapi.responses import StreamingResponse
+from src.core.responses import FastJSONResponse
 from src.services.callback import CallbackService
+from src.services.payment_events import payment_event_broker
 from src.services.redis import RedisService
-from src.schemas.callback import Callback, CallbackSchema, CallbackResponse
+from src.schemas.callback import Callback, CallbackSchema, CallbackResponse, parse_callback_form
+
+logger = logging.getLogger(__name__)
 
 callback_router = APIRouter()
 callback_service = CallbackService()
 redis_service = RedisService()
-# POST /callback
-@callback_router.post("", 
-                      status_code=status.HTTP_200_OK)
-async def create_callback(request: Request):
+
+async def read_callback_form(request: Request) -> Callback:
+    """
+    Build a Callback from a multipart or otherwise non-urlencoded form body.
+    """
     callback_data = await request.form()
-    callback = Callback(
+    return Callback(
         merchant_order_id=callback_data.get("merchantOrderId"),
         amount=int(callback_data.get("amount", 0)),
         merchant_code=callback_data.get("merchantCode"),
@@ -29,11 +36,20 @@ async def create_callback(request: Request):
         settlement_date=callback_data.get("settlementDate"),
         issuer_code=callback_data.get("issuerCode")
     )
+
+# POST /callback
+@callback_router.post("", 
+                      status_code=status.HTTP_200_OK)
+async def create_callback(request: Request):
+    if request.headers.get("content-type", "").startswith("application/x-www-form-urlencoded"):
+        callback = parse_callback_form(await request.body())
+    else:
+        callback = await read_callback_form(request)
     
-    result = await callback_service.process_callback(callback)
+    result = await callback_service.receive_callback(callback)
     if not result:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to create callback")
-    return result
+    return FastJSONResponse(result)
 
 @callback_router.post("/{order_id}")
 async def polling_order_status(payment_id: str, order_id: int, status: str = "pending"):
@@ -41,10 +57,20 @@ async def polling_order_status(payment_id: str, order_id: int, status: str = "pe
     Polling endpoint to check the status of an order.
     """
     process = await redis_service.notify_payment_status(payment_id, order_id, status)
-    print(f"Order status updated: {process}")
-    print(process.get("status", "No message provided"))
+    logger.debug(f"Order status updated: {process}")
     return {"message": "Order status updated"}
 
+@callback_router.get("/{payment_id}/events")
+async def payment_status_events(payment_id: str):
+    """
+    Server-Sent Events stream that pushes the payment status as soon as it changes.
+    """
+    return StreamingResponse(
+        payment_event_broker.events(payment_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # @callback_router.get("/{order_id}")
 # async def get_order_status(order_id: int, payment_id: str):
 #     """
@@ -60,19 +86,17 @@ async def publish_message(channel: str, message: str):
     """
     Publish a message to a Redis channel.
     """
-    print(f"Publishing message to channel {channel}: {message}")
-    from src.core.redis_client import RedisClient
+    logger.debug(f"Publishing message to channel {channel}: {message}")
+    from src.core.redis_client import redis_client
     import json
-    redis_service = RedisClient()
     try:
         data = {"order_id": message, "status": "success"}
-        # result = redis_service.publish("payment_updates", json.dumps(data))
-        result = redis_service.publish(channel, json.dumps(data))
-        print(f"Message published to channel {channel}: {data}")
+        # result = await redis_client.publish("payment_updates", json.dumps(data))
+        result = await redis_client.publish(channel, json.dumps(data))
+        logger.debug(f"Message published to channel {channel}: {data}, result {result}")
     except Exception as e:
-        print(f"Error publishing message to Redis: {e}")
+        logger.error(f"Error publishing message to Redis: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to publish message: {str(e)}")
-    print(f"Message published successfully: {result}")
     return {"message": "Message published successfully", "channel": channel, "result": result}
     # result = await redis_service.publish_message(channel, message)
     # if not result:
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, status
+from fastapi.responses import PlainTextResponse
+from src.core.metrics import metrics
+
+metrics_router = APIRouter()
+
+# GET /metrics
+@metrics_router.get("",
+                status_code=status.HTTP_200_OK,
+                response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus scrape endpoint: request, Supabase and Redis latency histograms,
+    error counters, connection pool state and in-memory cache counters.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,24 +1,73 @@
+import logging
 from typing import List, Union, Dict
-from fastapi import APIRouter, status, Depends, Request
+from fastapi import APIRouter, Body, Header, status, Depends, Query, Request
 from fastapi.exceptions import HTTPException
+from fastapi.responses import Response, StreamingResponse
+import orjson
+from src.core.config import configs
+from src.core.responses import FastJSONResponse, etag_matches, strong_etag
 from src.services.callback import CallbackService
 from src.services.order import OrderService
-from src.schemas.order import OrderResponse, OrderUpdateStatus, OrderUpdateResponse
+from src.schemas.order import OrderResponse, OrderUpdateStatus, OrderUpdateResponse, OrderBulkUpdateResponse, order_list_adapter
+
+logger = logging.getLogger(__name__)
 
 order_router = APIRouter()
 order_service = OrderService()
 
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": configs.orders_cache_control}
+
 # GET /orders
 @order_router.get("",
                 status_code=status.HTTP_200_OK,
                 response_model=OrderResponse,)
-async def get_orders(order_id: Union[int, None] = None):
-    orders = await order_service.get_orders(order_id=order_id)
+async def get_orders(order_id: Union[int, None] = None,
+                     limit: int = Query(configs.orders_page_size, ge=1, le=configs.orders_max_page_size),
+                     after: Union[int, None] = None,
+                     stream: bool = False,
+                     if_none_match: Union[str, None] = Header(None)):
+    if stream and not order_id:
+        return StreamingResponse(stream_orders(after), media_type="application/x-ndjson")
+
+    cache_lookup = None
+    if order_id and if_none_match:
+        # A cached order is compared as stored, before any assembly or validation.
+        cache_lookup = await order_service.peek_order(order_id)
+        cached = cache_lookup[0] if cache_lookup else None
+        if cached is not None:
+            etag = strong_etag(b"[" + cached + b"]", None)
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+
+    # The load reuses the lookup above rather than reading the cache a second time.
+    orders = await order_service.get_orders(order_id=order_id, limit=limit, after=after, cache_lookup=cache_lookup)
     
     if not orders:
         raise HTTPException(status_code=404, detail="Orders not found")
 
-    return OrderResponse(message="Orders retrieved successfully", data=orders)
+    next_cursor = orders[-1].order_id if not order_id and len(orders) == limit else None
+    data = order_list_adapter.dump_json(orders, exclude_none=True)
+    # The body is a function of the page and its cursor, so they are what the tag covers.
+    etag = strong_etag(data, str(next_cursor).encode() if next_cursor is not None else None)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+
+    # Same body as OrderResponse, with the page serialized once by pydantic-core.
+    return FastJSONResponse({
+        "message": "Orders retrieved successfully",
+        "data": orjson.Fragment(data),
+        "next_cursor": next_cursor,
+    }, headers=cache_headers(etag))
+
+async def stream_orders(after: Union[int, None]):
+    """Write orders as newline-delimited JSON while batches arrive from the database."""
+    try:
+        async for batch in order_service.iter_orders(after=after):
+            yield "".join(order.model_dump_json(exclude_none=True) + "\n" for order in batch)
+    except Exception as e:
+        # Headers are already sent, so the only signal left is a truncated stream.
+        logger.error(f"Order stream aborted: {e}")
 
 # update order status
 @order_router.put("/update-status",
@@ -27,15 +76,27 @@ async def get_orders(order_id: Union[int, None] = None):
 async def update_order_status(order_update: OrderUpdateStatus):
     try:
         updated_order = await order_service.update_order_status(order_update)
-        print(f"Updated order: {updated_order}")
-        print(f"Updated order status: {updated_order.get('status')}")
-        print(f"Updated order ID: {updated_order.get('order_id')}")
-        return OrderUpdateResponse(message="Order status updated successfully", data=OrderUpdateStatus(
+        logger.debug(f"Updated order {updated_order.get('order_id')} to status {updated_order.get('status')}")
+        return FastJSONResponse(OrderUpdateResponse(message="Order status updated successfully", data=OrderUpdateStatus(
             order_id=updated_order.get("order_id"),
             status=updated_order.get("status")
-        ))
+        )))
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# bulk update order status
+@order_router.put("/update-status/bulk",
+                status_code=status.HTTP_200_OK,
+                response_model=OrderBulkUpdateResponse)
+async def update_order_statuses(order_updates: List[OrderUpdateStatus] = Body(..., min_length=1, max_length=configs.orders_bulk_update_max)):
+    results = await order_service.update_order_statuses(order_updates)
+    counts = {outcome: sum(result.result == outcome for result in results) for outcome in ("success", "not_found", "error")}
+    return FastJSONResponse(OrderBulkUpdateResponse(
+        message="Order statuses updated" if not counts["error"] else "Some order statuses could not be updated",
+        updated=counts["success"],
+        not_found=counts["not_found"],
+        failed=counts["error"],
+        data=results,
+    ))
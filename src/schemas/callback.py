@@ -1,3 +1,4 @@
+from urllib.parse import unquote_plus
 from zoneinfo import ZoneInfo
 from pydantic import BaseModel, field_serializer
 from datetime import datetime
@@ -79,4 +80,53 @@ class PaymentInfo(BaseModel):
     #     if dt is None:
     #         return None  # Return None if no value
     #     return dt.strftime("%Y-%m-%d %H:%M:%S") 
-    
\ No newline at end of file
+    
+
+
+# Duitku callback form keys and the Callback fields they fill.
+CALLBACK_FORM_FIELDS = {
+    b"merchantOrderId": "merchant_order_id",
+    b"amount": "amount",
+    b"merchantCode": "merchant_code",
+    b"productDetails": "product_details",
+    b"additionalParam": "additional_param",
+    b"paymentCode": "payment_code",
+    b"resultCode": "result_code",
+    b"merchantUserId": "merchant_user_id",
+    b"reference": "reference",
+    b"signature": "signature",
+    b"publisherOrderId": "publisher_order_id",
+    b"spUserHash": "sp_user_hash",
+    b"settlementDate": "settlement_date",
+    b"issuerCode": "issuer_code",
+}
+
+
+def parse_callback_form(body: bytes) -> Callback:
+    """
+    Parse an application/x-www-form-urlencoded Duitku callback body into a Callback.
+
+    Splits the raw bytes once, decodes only the known keys and validates the
+    result with Callback's prebuilt pydantic-core validator. Matches the form
+    parser it replaces: the last of repeated keys wins, blank values stay "",
+    keys without "=" and unknown keys are ignored and a missing amount is 0.
+
+    Args:
+        body (bytes): The raw request body.
+
+    Returns:
+        Callback: The validated callback.
+    """
+    data = {"amount": 0}
+    for pair in body.split(b"&"):
+        key, sep, value = pair.partition(b"=")
+        if not sep:
+            continue
+        field = CALLBACK_FORM_FIELDS.get(key)
+        if field is None:
+            continue
+        if b"%" in value or b"+" in value:
+            data[field] = unquote_plus(value.decode("utf-8"))
+        else:
+            data[field] = value.decode("utf-8")
+    return Callback.__pydantic_validator__.validate_python(data)
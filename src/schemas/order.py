@@ -1,5 +1,5 @@
 from zoneinfo import ZoneInfo
-from pydantic import BaseModel, field_serializer
+from pydantic import BaseModel, TypeAdapter, field_serializer
 from datetime import datetime
 from typing import List, Optional, Literal
 # from typing_extensions import Literal
@@ -38,11 +38,15 @@ class Shipping(BaseModel):
 class OrderResponse(BaseModel):
     message: str
     data: List[Order]
+    next_cursor: Optional[int] = None
 
     @field_serializer("data")
     def serialize_data(self, data: List[Order], _info):
         return [item.model_dump(exclude_none=True) for item in data]
 
+# Validates and serializes a whole page of orders in one pydantic-core call.
+order_list_adapter = TypeAdapter(List[Order])
+
 class OrderUpdateStatus(BaseModel):
     order_id: int
     status: Literal['unpaid', 'processing', 'shipped', 'cancelled', 'completed']
@@ -54,3 +58,14 @@ class OrderUpdateStatus(BaseModel):
 class OrderUpdateResponse(BaseModel):
     message: str
     data: OrderUpdateStatus
+
+class OrderBulkUpdateResult(OrderUpdateStatus):
+    result: Literal['success', 'not_found', 'error']
+    error: Optional[str] = None
+
+class OrderBulkUpdateResponse(BaseModel):
+    message: str
+    updated: int
+    not_found: int
+    failed: int = 0
+    data: List[OrderBulkUpdateResult]
@@ -1,62 +1,264 @@
 from datetime import datetime
+from typing import List, Optional
 from fastapi import HTTPException
 from src.schemas.callback import Callback, CallbackResponse, CallbackSchema, get_payment_status, get_order_status
+from src.core.cache import TTLCache
 from src.core.config import configs
+from src.core.limiter import Overloaded
+from src.core.metrics import register_cache
 import hashlib
-from src.core.supabase_connection import supabase_orders, supabase_payments
+from src.core.redis_client import redis_client
+from src.core.supabase_connection import supabase_db
+from src.services.order_cache import order_cache
+from src.services.redis import RedisService
 from zoneinfo import ZoneInfo
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Responses to callbacks this worker already accepted, checked before Redis.
+accepted_callbacks = TTLCache(maxsize=configs.callback_dedup_local_size, ttl=configs.callback_dedup_ttl)
+register_cache("callback_dedup", accepted_callbacks)
+
+# Dedup marker value while the first delivery of a callback is being processed.
+CALLBACK_PROCESSING = b"processing"
 
 class CallbackService:
+    def __init__(self):
+        self.redis_service = RedisService()
+
     async def get_callbacks(self):
         result = [{"id": 1, "name": "Callback Example", "status": "active"},
                   {"id": 2, "name": "Another Callback", "status": "inactive"}]
         return result
 
-    async def process_callback(self, callback: Callback):
-        # Simulate processing the callback
-        try:
-            raw = f"{callback.merchant_code}{callback.amount}{callback.merchant_order_id}{configs.duitku_api_key}"
-            
-            expected_signature = hashlib.md5(raw.encode("utf-8")).hexdigest()
-            
-            if callback.signature != expected_signature:
-                raise HTTPException(status_code=400, detail="Invalid signature")
-            
-            update_payments = supabase_payments.update_where(
-                conditions={
-                    "payment_id": callback.merchant_order_id,
-                    "reference": callback.reference
-                }, 
-                new_values={
-                    "payment_method": callback.payment_code,
-                    "payment_status": get_payment_status(callback.result_code),
-                    "publisher_order_id": callback.publisher_order_id,
-                    "merchant_user_id": callback.merchant_user_id,
-                    "sp_user_hash": callback.sp_user_hash,
-                    "settlement_date": callback.settlement_date,
-                    "paid_at": datetime.now(ZoneInfo("Asia/Jakarta")).isoformat(),
-                    "issuer_code": callback.issuer_code,
-                }
+    def verify_signature(self, callback: Callback):
+        raw = f"{callback.merchant_code}{callback.amount}{callback.merchant_order_id}{configs.duitku_api_key}"
+
+        expected_signature = hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+        if callback.signature != expected_signature:
+            raise HTTPException(status_code=400, detail="Invalid signature")
+
+    def build_response(self, callback: Callback) -> CallbackResponse:
+        return CallbackResponse(
+            message="Callback received successfully",
+            data=CallbackSchema(**callback.model_dump(exclude_none=True),
+                                 status=callback.result_code,
+                                 order_status=callback.result_code
             )
-            
-            update_order = supabase_orders.update_where(
-                conditions={
-                    'order_id': update_payments.data[0].get("order_id"),
-                },
-                new_values={
-                    "status": get_order_status(callback.result_code),
-                }
+        )
+
+    def idempotency_key(self, callback: Callback) -> str:
+        return f"callback:{callback.merchant_order_id}:{callback.reference}:{callback.result_code}"
+
+    async def receive_callback(self, callback: Callback):
+        """
+        Accept a gateway callback exactly once.
+
+        Re-sent callbacks are answered with the response of the first delivery
+        without touching Supabase. The in-process cache answers repeats seen by
+        this worker; a Redis SET NX marker covers the other workers. The marker
+        reads "processing" until the first delivery has succeeded, and repeats
+        arriving meanwhile get a retryable 409, since that delivery may still
+        fail. A failed delivery releases the marker so the gateway's retry goes
+        through.
+        """
+        key = self.idempotency_key(callback)
+        cached = accepted_callbacks.get(key)
+        if cached is not None and cached.data.signature == callback.signature:
+            return cached
+
+        self.verify_signature_or_raise(callback)
+        claimed = await self._claim(key, callback)
+        if isinstance(claimed, CallbackResponse):
+            accepted_callbacks.set(key, claimed)
+            return claimed
+
+        try:
+            if configs.callback_queue_enabled:
+                result = await self.enqueue_callback(callback)
+            else:
+                result = await self.process_callback(callback)
+        except Exception:
+            if claimed is True:
+                await self._release(key)
+            raise
+
+        if claimed is True:
+            await self._complete(key, callback)
+        accepted_callbacks.set(key, result)
+        return result
+
+    async def _claim(self, key: str, callback: Callback):
+        """
+        Mark a callback as being processed in Redis.
+
+        The "processing" marker expires after `callback_processing_ttl` seconds,
+        so a worker that dies mid-delivery does not block the gateway's retries
+        for the whole dedup TTL.
+
+        Returns:
+            True if this call claimed it, the earlier response if it was a
+            duplicate, or None if Redis could not be used.
+
+        Raises:
+            HTTPException: 409 while an earlier delivery is still being processed
+        """
+        try:
+            claimed = await redis_client.client.set(
+                key, CALLBACK_PROCESSING, nx=True, ex=configs.callback_processing_ttl
+            )
+            if claimed:
+                return True
+            previous = await redis_client.get(key)
+        except Exception as e:
+            logger.warning(f"Callback dedup unavailable, processing {key} without it: {e}")
+            return None
+        if previous is None:
+            return None
+        if previous == CALLBACK_PROCESSING:
+            raise HTTPException(
+                status_code=409,
+                detail="Callback is still being processed, retry later",
+                headers={"Retry-After": "1"},
+            )
+        previous = Callback.model_validate_json(previous)
+        if previous.signature != callback.signature:
+            return None
+        return self.build_response(previous)
+
+    async def _complete(self, key: str, callback: Callback):
+        """Replace the "processing" marker with the accepted callback for `callback_dedup_ttl` seconds."""
+        try:
+            await redis_client.client.set(key, callback.model_dump_json(), xx=True, ex=configs.callback_dedup_ttl)
+        except Exception as e:
+            # The processing marker expires shortly; a retry after that is applied again.
+            logger.warning(f"Failed to record callback {key} as accepted: {e}")
+
+    async def _release(self, key: str):
+        try:
+            await redis_client.delete(key)
+        except Exception as e:
+            logger.warning(f"Failed to release callback dedup marker {key}: {e}")
+
+    def verify_signature_or_raise(self, callback: Callback):
+        try:
+            self.verify_signature(callback)
+        except Exception as e:
+            logger.error(f"Error processing callback: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error processing callback: {str(e)}")
+
+    async def process_callback(self, callback: Callback):
+        """Verify a callback and apply it to Supabase before answering."""
+        try:
+            self.verify_signature(callback)
+            await self.apply_callback(callback)
+            return self.build_response(callback)
+
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.error(f"Error processing callback: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error processing callback: {str(e)}")
+
+    async def enqueue_callback(self, callback: Callback):
+        """
+        Verify a callback and append it to the callback stream for the background
+        writer, answering the gateway without waiting for the database.
+
+        Falls back to processing inline when the stream cannot be written.
+        """
+        self.verify_signature_or_raise(callback)
+
+        try:
+            await redis_client.client.xadd(
+                configs.callback_stream,
+                {"callback": callback.model_dump_json(), "received_at": self._now()},
+                maxlen=configs.callback_stream_maxlen,
+                approximate=True,
             )
-            
-            return CallbackResponse(
-                message="Callback received successfully",
-                data=CallbackSchema(**callback.model_dump(exclude_none=True), 
-                                     status=callback.result_code,
-                                     order_status=callback.result_code
-                )
+        except Exception as e:
+            logger.warning(f"Callback stream unavailable, processing {callback.merchant_order_id} inline: {e}")
+            return await self.process_callback(callback)
+
+        return self.build_response(callback)
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now(ZoneInfo("Asia/Jakarta")).isoformat()
+
+    def _payment_update(self, callback: Callback, received_at: Optional[str] = None) -> dict:
+        return {
+            "payment_id": callback.merchant_order_id,
+            "reference": callback.reference,
+            "payment_method": callback.payment_code,
+            "payment_status": get_payment_status(callback.result_code),
+            "publisher_order_id": callback.publisher_order_id,
+            "merchant_user_id": callback.merchant_user_id,
+            "sp_user_hash": callback.sp_user_hash,
+            "settlement_date": callback.settlement_date,
+            "paid_at": received_at or self._now(),
+            "issuer_code": callback.issuer_code,
+            "order_status": get_order_status(callback.result_code),
+        }
+
+    async def apply_callback(self, callback: Callback):
+        """Write a verified callback to the payment and its order, then notify listeners."""
+        result = (await self.apply_callbacks([callback]))[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def apply_callbacks(self, callbacks: List[Callback], received_at: Optional[List[Optional[str]]] = None) -> list:
+        """
+        Apply a batch of verified callbacks in one round trip.
+
+        The `apply_payment_callbacks` database function updates each payment and
+        its order in the same transaction, so a callback is either fully applied
+        or not at all. Callbacks are applied in list order, and one that would
+        move a settled payment (success or failed) to another status is skipped
+        by the database; it still counts as handled. A callback the database
+        rejects fails on its own; the rest of the batch is still applied.
+
+        Args:
+            callbacks (List[Callback]): Verified callbacks, oldest first
+            received_at (list, optional): When each callback reached us, recorded as paid_at; now if missing
+
+        Returns:
+            list: The order_id for each handled callback, or the exception it raised.
+        """
+        received_at = received_at or [None] * len(callbacks)
+        try:
+            rows = await supabase_db.rpc(
+                "apply_payment_callbacks",
+                {"callbacks": [self._payment_update(callback, received) for callback, received in zip(callbacks, received_at)]},
             )
-                
-        
         except Exception as e:
-            print(f"Error processing callback: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Error processing callback: {str(e)}") 
\ No newline at end of file
+            return [e] * len(callbacks)
+        if len(rows) != len(callbacks):
+            error = RuntimeError(f"apply_payment_callbacks returned {len(rows)} rows for {len(callbacks)} callbacks")
+            return [error] * len(callbacks)
+
+        results = []
+        for callback, row in zip(callbacks, rows):
+            if row.get("error"):
+                results.append(ValueError(f"Payment {callback.merchant_order_id} could not be applied: {row['error']}"))
+            elif row.get("order_id") is None:
+                results.append(ValueError(f"Payment {callback.merchant_order_id} with reference {callback.reference} not found"))
+            else:
+                results.append(row["order_id"])
+
+        applied = [
+            {"payment_id": callback.merchant_order_id, "order_id": result, "status": get_payment_status(callback.result_code)}
+            for callback, result, row in zip(callbacks, results, rows)
+            if not isinstance(result, Exception) and row.get("applied", True)
+        ]
+        await order_cache.invalidate(update["order_id"] for update in applied)
+        try:
+            await self.redis_service.notify_payment_statuses(applied)
+        except Exception as e:
+            # The payments are already committed; a missed notification must not fail the webhook.
+            logger.warning(f"Failed to notify payment status for {len(applied)} payments: {e}")
+
+        return results
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import List, Tuple
+from redis.exceptions import ResponseError
+from src.core.config import configs
+from src.core.limiter import PRIORITY_CRITICAL, Overloaded, prioritize
+from src.core.redis_client import redis_client
+from src.schemas.callback import Callback
+from src.services.callback import CallbackService
+
+logger = logging.getLogger(__name__)
+
+
+def stream_id(entry_id: bytes) -> Tuple[int, int]:
+    """Sort key for a stream entry id such as b"1719800000000-3"."""
+    milliseconds, _, sequence = entry_id.partition(b"-")
+    return int(milliseconds), int(sequence or 0)
+
+
+class CallbackStreamWorker:
+    """
+    Background writer that drains the callback stream into Supabase.
+
+    Reads callbacks through a consumer group in batches and applies each batch
+    with CallbackService.apply_callbacks. Entries are acknowledged once written.
+    Failed entries stay pending and are reclaimed after `callback_claim_idle_ms`.
+    After `callback_max_retries` deliveries they move to the dead-letter stream.
+    """
+
+    def __init__(self, callback_service: CallbackService = None):
+        self.callback_service = callback_service or CallbackService()
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._task = None
+        self._running = False
+
+    async def start(self):
+        """Create the consumer group if needed and start draining the stream."""
+        if self._task is None:
+            self._running = True
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._running = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _ensure_group(self):
+        try:
+            await redis_client.client.xgroup_create(
+                configs.callback_stream, configs.callback_consumer_group, id="0", mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _run(self):
+        # Callback writes go ahead of order reads when Supabase is saturated.
+        prioritize(PRIORITY_CRITICAL)
+        group_ready = False
+        # redis-py may turn a cancellation during a blocking read into a
+        # ConnectionError, so the flag is what reliably ends the loop.
+        while self._running:
+            try:
+                if not group_ready:
+                    await self._ensure_group()
+                    group_ready = True
+                started = time.monotonic()
+                # Reclaimed entries are older than new ones; the database applies a
+                # batch in order, so sort it by stream id to keep callbacks in sequence.
+                entries = await self._reclaim_stale() + await self._read_new()
+                entries.sort(key=lambda entry: stream_id(entry[0]))
+                if entries:
+                    await self.process_entries(entries)
+                else:
+                    # Servers that ignore BLOCK (some proxies, fakeredis) answer an empty
+                    # read at once; wait out the interval instead of spinning.
+                    remaining = configs.callback_block_ms / 1000 - (time.monotonic() - started)
+                    if remaining > 0:
+                        await asyncio.sleep(remaining)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Callback worker error, retrying: {e}")
+                group_ready = False
+                await asyncio.sleep(1.0)
+
+    async def _read_new(self) -> List[Tuple[bytes, dict]]:
+        response = await redis_client.client.xreadgroup(
+            configs.callback_consumer_group,
+            self.consumer,
+            {configs.callback_stream: ">"},
+            count=configs.callback_batch_size,
+            block=configs.callback_block_ms,
+        )
+        return [entry for _, stream_entries in response or [] for entry in stream_entries]
+
+    async def _reclaim_stale(self) -> List[Tuple[bytes, dict]]:
+        """Take over entries another delivery failed to acknowledge in time."""
+        response = await redis_client.client.xautoclaim(
+            configs.callback_stream,
+            configs.callback_consumer_group,
+            self.consumer,
+            min_idle_time=configs.callback_claim_idle_ms,
+            count=configs.callback_batch_size,
+        )
+        return [entry for entry in response[1] if entry[1]]
+
+    async def process_entries(self, entries: List[Tuple[bytes, dict]]):
+        """Apply one batch of stream entries and settle each of them."""
+        callbacks, received_at, ids = [], [], []
+        for entry_id, fields in entries:
+            try:
+                callbacks.append(Callback.model_validate_json(fields[b"callback"]))
+            except Exception as e:
+                await self._dead_letter(entry_id, fields, f"Malformed callback: {e}")
+                continue
+            received = fields.get(b"received_at")
+            received_at.append(received.decode() if received else None)
+            ids.append(entry_id)
+
+        results = await self.callback_service.apply_callbacks(callbacks, received_at) if callbacks else []
+
+        acked = [entry_id for entry_id, result in zip(ids, results) if not isinstance(result, Exception)]
+        if acked:
+            await redis_client.client.xack(configs.callback_stream, configs.callback_consumer_group, *acked)
+
+        fields_by_id = dict(entries)
+        overloaded = None
+        for entry_id, result in zip(ids, results):
+            if isinstance(result, Overloaded):
+                # Not the callback's fault: leave it pending without spending a retry on it.
+                overloaded = result
+            elif isinstance(result, Exception):
+                await self._retry_or_dead_letter(entry_id, fields_by_id[entry_id], result)
+        if overloaded is not None:
+            logger.warning(f"Supabase overloaded, pausing callback writes for {overloaded.retry_after}s")
+            await asyncio.sleep(overloaded.retry_after)
+
+    async def _retry_or_dead_letter(self, entry_id: bytes, fields: dict, error: Exception):
+        pending = await redis_client.client.xpending_range(
+            configs.callback_stream, configs.callback_consumer_group,
+            min=entry_id, max=entry_id, count=1,
+        )
+        deliveries = pending[0]["times_delivered"] if pending else 1
+        if deliveries >= configs.callback_max_retries:
+            await self._dead_letter(entry_id, fields, str(error))
+        else:
+            logger.warning(f"Callback {entry_id!r} failed (delivery {deliveries}), will retry: {error}")
+
+    async def _dead_letter(self, entry_id: bytes, fields: dict, reason: str):
+        logger.error(f"Moving callback {entry_id!r} to {configs.callback_dead_letter_stream}: {reason}")
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.xadd(configs.callback_dead_letter_stream, {**fields, b"error": reason, b"source_id": entry_id})
+            pipe.xack(configs.callback_stream, configs.callback_consumer_group, entry_id)
+            await pipe.execute()
+
+
+callback_stream_worker = CallbackStreamWorker()
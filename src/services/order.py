@@ -1,78 +1,270 @@
+import asyncio
+import logging
 from datetime import datetime
+from typing import List, Optional, Tuple
 from fastapi import HTTPException
-from src.schemas.order import Order, Address, Shipping, Product, OrderUpdateStatus
+from src.schemas.order import Address, Order, OrderBulkUpdateResult, OrderUpdateStatus, Product, Shipping, order_list_adapter
 from src.core.config import configs
+from src.core.limiter import Overloaded
+from src.core.metrics import metrics
+from src.core.singleflight import SingleFlight
 import hashlib
-from src.core.supabase_connection import supabase_orders, supabase_orders_details, supabase_products
+from src.core.supabase_connection import supabase_orders, supabase_orders_details
+from src.services.order_cache import order_cache
+from src.services.order_replica import OrderReplica
+from src.services.product import PRODUCT_COLUMNS, ProductService
+from src.utils import model_columns
 from zoneinfo import ZoneInfo
 
+logger = logging.getLogger(__name__)
+
+order_reads = SingleFlight("orders", max_pending=configs.singleflight_max_pending)
+
+# Only the columns the response schemas are built from.
+ORDER_COLUMNS = (
+    model_columns(Order, exclude={"address", "shipping_info", "items"})
+    + model_columns(Address)
+    + model_columns(Shipping)
+)
+ORDER_DETAIL_COLUMNS = ["order_id", *model_columns(Product, exclude={"name"})]
+
+order_replica = OrderReplica(ORDER_COLUMNS, ORDER_DETAIL_COLUMNS, PRODUCT_COLUMNS)
+metrics.add_collector(order_replica.collect)
+
 class OrderService:
-    async def get_orders(self, order_id: int = None):
+    def __init__(self):
+        self.product_service = ProductService()
+
+    async def get_orders(self, order_id: int = None, limit: int = None, after: int = None,
+                         cache_lookup: Optional[Tuple[Optional[bytes], Optional[bytes]]] = None):
+        """
+        Get a single order, or one keyset-paginated page of orders.
+
+        With the order replica enabled and in sync, orders it holds are built
+        from memory. Otherwise single orders are read through the Redis order
+        cache, and concurrent identical calls share one load.
+
+        Args:
+            order_id (int, optional): Return only this order.
+            limit (int, optional): Page size, defaults to `orders_page_size`.
+            after (int, optional): Return orders with an order_id greater than this cursor.
+            cache_lookup (tuple, optional): What `peek_order` already read from the
+                order cache for `order_id`, used instead of reading it again.
+        """
+        if configs.order_replica_enabled:
+            replicated = order_replica.select(order_id, limit or configs.orders_page_size, after)
+            if replicated is not None:
+                return self._build_orders(*replicated)
+        if not configs.singleflight_enabled:
+            return await self._load_orders(order_id, limit, after, cache_lookup)
+        key = (order_id,) if order_id else (None, limit, after)
+        return await order_reads.do(key, lambda: self._load_orders(order_id, limit, after, cache_lookup))
+
+    async def peek_order(self, order_id: int) -> Optional[Tuple[Optional[bytes], Optional[bytes]]]:
+        """
+        The order as GET /orders last returned it, when that is cheaper than loading it
+
+        Lets conditional requests be answered without assembling the order. Reads
+        the Redis order cache; returns None while the replica is in sync, since
+        get_orders is as cheap then.
+
+        Args:
+            order_id (int): The order to look up
+
+        Returns:
+            tuple: `order_cache.lookup`'s (cached JSON, version), to pass on to
+            get_orders as `cache_lookup` if the order still has to be loaded,
+            or None when the cache was not read
+        """
+        if configs.order_replica_enabled and order_replica.ready:
+            return None
+        return await order_cache.lookup(order_id)
+
+    async def _load_orders(self, order_id: int = None, limit: int = None, after: int = None,
+                           cache_lookup: Optional[Tuple[Optional[bytes], Optional[bytes]]] = None):
         try:
             if order_id:
-                orders = supabase_orders.select_where(
-                    conditions={"order_id": order_id}
-                )
-            else:
-                orders = supabase_orders.select_all() # Debugging line to check order IDs
-
-            orders_output = []
-            for order in orders:
-                order_output = Order(
-                    order_id=order.get("order_id"),
-                    customer_id=order.get("customer_id"),
-                    order_date=order.get("order_date"),
-                    status=order.get("status"),
-                    address=Address(
-                        address=order.get("address"),
-                        city=order.get("city"),
-                        district=order.get("district"),
-                        subdistrict=order.get("subdistrict"),
-                        province=order.get("province"),
-                        postal_code=order.get("postal_code"),
-                    ),
-                    shipping_info=Shipping(
-                        shipping_name=order.get("shipping_name"),
-                        service_type=order.get("service_type"),
-                        service_name=order.get("service_name"),
-                        shipping_cost=order.get("shipping_cost"),
-                        is_cod=order.get("is_cod"),
-                        estimated_delivery_date=order.get("estimated_delivery_date")
-                    ),
-                    items=[],
-                )
-                order_detail = supabase_orders_details.select_where(
-                    conditions={"order_id": order.get("order_id")}
+                cached, version = cache_lookup or await order_cache.lookup(order_id)
+                if cached is not None:
+                    return [Order.model_validate_json(cached)]
+                orders = await supabase_orders.select_where(
+                    conditions={"order_id": order_id}, columns=ORDER_COLUMNS
                 )
-                for item in order_detail:
-                    product = supabase_products.select_where(
-                        conditions={"sku": item.get("sku")}
-                    )
-                    
-                    
-                    order_output.items.append(Product(
-                        name=product[0].get("name"),
-                        quantity=item.get("quantity"),
-                        sku=item.get("sku"),
-                        unit_price=item.get("unit_price")
-                    ))
-                orders_output.append(order_output)
-
-            return orders_output
+                assembled = await self._assemble_orders(orders)
+                if assembled:
+                    await order_cache.set(assembled[0], version)
+                return assembled
 
+            orders = await supabase_orders.select_after(
+                "order_id", after=after, limit=limit or configs.orders_page_size, columns=ORDER_COLUMNS
+            )
+            return await self._assemble_orders(orders)
+
+        except Overloaded:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error retrieving orders: {str(e)}")
 
+    async def iter_orders(self, after: int = None, batch_size: int = None):
+        """
+        Yield every order after the cursor, one assembled batch at a time.
+
+        Only one batch is held in memory, so the cost of walking the whole
+        table stays flat regardless of its size.
+
+        Args:
+            after (int, optional): Start after this order_id.
+            batch_size (int, optional): Orders per batch, defaults to `orders_stream_batch_size`.
+        """
+        batch_size = batch_size or configs.orders_stream_batch_size
+        while True:
+            orders = await supabase_orders.select_after("order_id", after=after, limit=batch_size, columns=ORDER_COLUMNS)
+            if not orders:
+                return
+            yield await self._assemble_orders(orders)
+            if len(orders) < batch_size:
+                return
+            after = orders[-1].get("order_id")
+
+    async def _assemble_orders(self, orders: list[dict]) -> list[Order]:
+        """
+        Join orders with their line items and product names in memory.
+
+        Loads every order_details row for the given orders with one `in` query
+        and resolves referenced products through the product cache, instead of
+        querying per order and per line item.
+        """
+        order_details = await supabase_orders_details.select_in(
+            "order_id", [order.get("order_id") for order in orders], columns=ORDER_DETAIL_COLUMNS
+        )
+        product_by_sku = await self.product_service.get_products(
+            item.get("sku") for item in order_details
+        )
+        return self._build_orders(orders, order_details, product_by_sku)
+
+    @staticmethod
+    def _build_orders(orders: list[dict], order_details: list[dict], product_by_sku: dict) -> list[Order]:
+        """Turn order, order_details and product rows into Order models, in the order of `orders`."""
+        details_by_order: dict = {}
+        for item in order_details:
+            details_by_order.setdefault(item.get("order_id"), []).append(item)
+
+        # Build plain dicts and validate the whole page in one pydantic-core call.
+        orders_output = order_list_adapter.validate_python([
+            {
+                "order_id": order.get("order_id"),
+                "customer_id": order.get("customer_id"),
+                "order_date": order.get("order_date"),
+                "status": order.get("status"),
+                "address": {
+                    "address": order.get("address"),
+                    "city": order.get("city"),
+                    "district": order.get("district"),
+                    "subdistrict": order.get("subdistrict"),
+                    "province": order.get("province"),
+                    "postal_code": order.get("postal_code"),
+                },
+                "shipping_info": {
+                    "shipping_name": order.get("shipping_name"),
+                    "service_type": order.get("service_type"),
+                    "service_name": order.get("service_name"),
+                    "shipping_cost": order.get("shipping_cost"),
+                    "is_cod": order.get("is_cod"),
+                    "estimated_delivery_date": order.get("estimated_delivery_date"),
+                },
+                "items": [
+                    {
+                        "name": product_by_sku.get(item.get("sku"), {}).get("name"),
+                        "quantity": item.get("quantity"),
+                        "sku": item.get("sku"),
+                        "unit_price": item.get("unit_price"),
+                    }
+                    for item in details_by_order.get(order.get("order_id"), [])
+                ],
+            }
+            for order in orders
+        ])
+
+        return orders_output
+
     async def update_order_status(self, order_update: OrderUpdateStatus):
         try:
-            update_order = supabase_orders.update_where(
+            update_order = await supabase_orders.update_where(
                 conditions={"order_id": order_update.order_id},
-                new_values={"status": order_update.status}
+                new_values={"status": order_update.status},
+                columns=model_columns(OrderUpdateStatus),
             )
             if not update_order.data[0]:
                 raise HTTPException(status_code=404, detail="Order not found")
-            
-            
+
+            await order_cache.invalidate([order_update.order_id])
             return update_order.data[0]
+        except Overloaded:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error updating order status: {str(e)}")
+
+    async def update_order_statuses(self, order_updates: List[OrderUpdateStatus]) -> List[OrderBulkUpdateResult]:
+        """
+        Apply many status changes with one `in`-filtered update per target status
+        and chunk of `orders_bulk_update_chunk_size` orders, sent concurrently.
+
+        When an order appears more than once, its last status wins. A chunk that
+        fails does not undo the others: its orders are reported with result
+        "error", and every order that was updated is still evicted from the cache.
+
+        Args:
+            order_updates (List[OrderUpdateStatus]): order_id/status pairs.
+
+        Returns:
+            List[OrderBulkUpdateResult]: One result per distinct order, in request order.
+
+        Raises:
+            Overloaded, HTTPException: When no chunk could be applied at all
+        """
+        latest = {update.order_id: update.status for update in order_updates}
+        ids_by_status: dict = {}
+        for order_id, status in latest.items():
+            ids_by_status.setdefault(status, []).append(order_id)
+
+        chunk_size = configs.orders_bulk_update_chunk_size
+        chunks = [
+            (status, ids[start:start + chunk_size])
+            for status, ids in ids_by_status.items()
+            for start in range(0, len(ids), chunk_size)
+        ]
+        outcomes = await asyncio.gather(
+            *(
+                supabase_orders.update_in("order_id", ids, {"status": status}, chunk_size=chunk_size, columns=["order_id"])
+                for status, ids in chunks
+            ),
+            return_exceptions=True,
+        )
+
+        updated_ids, errors = set(), {}
+        for (_, ids), outcome in zip(chunks, outcomes):
+            if isinstance(outcome, Exception):
+                errors.update(dict.fromkeys(ids, outcome))
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                updated_ids.update(row.get("order_id") for row in outcome)
+        await order_cache.invalidate(updated_ids)
+
+        if errors and len(errors) == len(latest):
+            error = next(iter(errors.values()))
+            if isinstance(error, Overloaded):
+                raise error
+            raise HTTPException(status_code=500, detail=f"Error updating order statuses: {str(error)}")
+        for error in set(errors.values()):
+            logger.error(f"Error updating order statuses: {error}")
+
+        return [
+            OrderBulkUpdateResult(
+                order_id=order_id,
+                status=status,
+                result="error" if order_id in errors else "success" if order_id in updated_ids else "not_found",
+                error=f"Error updating order status: {str(errors[order_id])}" if order_id in errors else None,
+            )
+            for order_id, status in latest.items()
+        ]
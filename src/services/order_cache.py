@@ -0,0 +1,111 @@
+import logging
+import uuid
+from typing import Iterable, Optional, Tuple
+from src.core.config import configs
+from src.core.metrics import metrics
+from src.core.redis_client import redis_client
+from src.schemas.order import Order
+
+logger = logging.getLogger(__name__)
+
+order_cache_lookups = metrics.counter(
+    "order_cache_lookups_total", "Single-order cache lookups by result", ["result"]
+)
+
+
+# Cache a loaded order only if its version is still the one read before the load.
+CACHE_IF_UNCHANGED = """
+if (redis.call('GET', KEYS[2]) or '') == ARGV[2] then
+    return redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+end
+return false
+"""
+
+
+class OrderCache:
+    """
+    Read-through cache of assembled orders in Redis.
+
+    Orders are stored as the JSON GET /orders returns (None fields dropped) under
+    `order:{order_id}` with a TTL. Writers delete the key after changing an order;
+    the TTL bounds staleness from anything that is not invalidated explicitly,
+    such as product renames. Redis errors are logged and treated as misses, so
+    the database stays the fallback.
+
+    Invalidating also sets `order:{order_id}:version` to a new random value. A
+    reader notes the version together with its miss and fills the cache only if
+    it is unchanged, so a load that started before a write cannot put the old
+    order back afterwards. Random values, unlike a counter that restarts once
+    its key expires, never repeat a version an earlier reader holds.
+    """
+
+    def __init__(self):
+        self.redis_client = redis_client
+        self._cache_if_unchanged = redis_client.client.register_script(CACHE_IF_UNCHANGED)
+
+    @staticmethod
+    def key(order_id: int) -> str:
+        return f"order:{order_id}"
+
+    @staticmethod
+    def version_key(order_id: int) -> str:
+        return f"order:{order_id}:version"
+
+    async def lookup(self, order_id: int) -> Tuple[Optional[bytes], Optional[bytes]]:
+        """
+        Get a cached order's JSON and the order's cache version in one round trip
+
+        Args:
+            order_id (int): The order to look up
+
+        Returns:
+            tuple: The cached JSON, or None on a miss or when Redis is unavailable,
+            and the version to pass to `set` (None when Redis is unavailable)
+        """
+        if not configs.order_cache_enabled:
+            return None, None
+        try:
+            cached, version = await self.redis_client.client.mget(self.key(order_id), self.version_key(order_id))
+        except Exception as e:
+            order_cache_lookups.inc(result="error")
+            logger.warning(f"Order cache unavailable, reading order {order_id} from the database: {e}")
+            return None, None
+        order_cache_lookups.inc(result="miss" if cached is None else "hit")
+        return cached, version or b""
+
+    async def set(self, order: Order, version: Optional[bytes]):
+        """
+        Store an assembled order for `order_cache_ttl` seconds, unless it changed since `lookup`
+
+        Args:
+            order (Order): The order as loaded after the miss
+            version (bytes): The version `lookup` returned with the miss; None skips caching
+        """
+        if not configs.order_cache_enabled or version is None:
+            return
+        try:
+            await self._cache_if_unchanged(
+                keys=[self.key(order.order_id), self.version_key(order.order_id)],
+                args=[order.__pydantic_serializer__.to_json(order, exclude_none=True), version, configs.order_cache_ttl],
+            )
+        except Exception as e:
+            logger.warning(f"Failed to cache order {order.order_id}: {e}")
+
+    async def invalidate(self, order_ids: Iterable[int]):
+        """Drop cached orders after they change and bump their versions, in one transaction."""
+        order_ids = [order_id for order_id in dict.fromkeys(order_ids) if order_id is not None]
+        if not order_ids or not configs.order_cache_enabled:
+            return
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.delete(*(self.key(order_id) for order_id in order_ids))
+                for order_id in order_ids:
+                    # Outlives any load that could have read the previous version.
+                    pipe.set(self.version_key(order_id), uuid.uuid4().hex, ex=configs.order_cache_ttl)
+                await pipe.execute()
+        except Exception as e:
+            # The TTL still expires the stale entries.
+            logger.warning(f"Failed to invalidate {len(order_ids)} cached orders: {e}")
+
+
+order_cache = OrderCache()
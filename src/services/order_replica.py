@@ -0,0 +1,343 @@
+import asyncio
+import bisect
+import itertools
+import logging
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from src.core.config import configs
+from src.core.metrics import metrics
+from src.core.supabase_connection import supabase_orders, supabase_orders_details, supabase_products
+
+logger = logging.getLogger(__name__)
+
+replica_stats = metrics.gauge(
+    "order_replica", "In-process order replica rows, estimated memory, sync state and replication lag", ["stat"]
+)
+replica_changes = metrics.counter(
+    "order_replica_changes_total", "Change feed events applied to the order replica", ["table", "type"]
+)
+
+# Rows sampled per table when estimating the replica's memory use.
+MEMORY_SAMPLE_SIZE = 64
+
+
+def _row_size(row: dict) -> int:
+    # Column names are shared strings, so only the dict and its values count.
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+
+
+def _estimate_size(values: Iterable, count: int, size: Callable[[Any], int] = _row_size) -> int:
+    """Approximate bytes held by `count` values, extrapolated from the first few of them."""
+    sample = list(itertools.islice(values, MEMORY_SAMPLE_SIZE))
+    if not sample:
+        return 0
+    return sum(size(value) for value in sample) * count // len(sample)
+
+
+class OrderReplica:
+    """
+    In-memory copy of the newest orders, their line items and the product
+    catalogue, kept current from the Supabase realtime change feed.
+
+    Syncing subscribes to changes on orders, order_details and master_products
+    first, then bulk-reads the newest `order_replica_max_orders` orders with
+    their line items and every product, and finally replays the changes that
+    arrived during the read. Changes carry whole rows, so replaying one the
+    read already saw is harmless. After that each change is applied as it
+    arrives and `select` answers without leaving the process.
+
+    Every order from `floor` upwards is held (all of them while `floor` is
+    None); older orders, and any read while the replica is not in sync, are
+    left to the database. Changes sent while the feed is disconnected are
+    lost, so a dropped connection or channel error takes the replica out of
+    service until it has synced again from scratch.
+
+    Line items are keyed by (order_id, sku). Deletes only carry the whole old
+    row with REPLICA IDENTITY FULL, see migrations/002_order_replica.sql.
+    """
+
+    def __init__(self, order_columns: List[str], detail_columns: List[str], product_columns: List[str]):
+        self.order_columns = order_columns
+        self.detail_columns = detail_columns
+        self.product_columns = product_columns
+        self.max_orders = configs.order_replica_max_orders
+        self.ready = False
+        self.floor: Optional[int] = None
+        self.orders: Dict[int, dict] = {}
+        self.details: Dict[int, Dict[str, dict]] = {}
+        self.products: Dict[str, dict] = {}
+        self.lag = 0.0
+        self.last_change = 0.0
+        self.syncs = 0
+        self._order_ids: List[int] = []
+        self._buffer: Optional[list] = None
+        self._client = None
+        self._feed_lost: Optional[asyncio.Event] = None
+        self._task = None
+        self._running = False
+
+    async def start(self):
+        """Connect to the change feed and keep the replica in sync until stopped."""
+        if self._task is None:
+            self._running = True
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._running = False
+        self.ready = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._disconnect()
+
+    def select(self, order_id: int = None, limit: int = 100, after: int = None) -> Optional[Tuple[list, list, dict]]:
+        """
+        Rows for one order or one keyset page, if the replica can answer for them
+
+        Args:
+            order_id (int, optional): Return only this order
+            limit (int): Page size
+            after (int, optional): Return orders with an order_id greater than this cursor
+
+        Returns:
+            tuple: (orders, order_details, product_by_sku) for OrderService._build_orders,
+            or None when the database has to answer
+        """
+        if not self.ready:
+            return None
+        if order_id:
+            # A missing order may just not have reached the replica yet.
+            order = self.orders.get(order_id)
+            if order is None:
+                return None
+            orders = [order]
+        else:
+            if self.floor is not None and (after is None or after < self.floor - 1):
+                return None
+            start = 0 if after is None else bisect.bisect_right(self._order_ids, after)
+            orders = [self.orders[order_id] for order_id in self._order_ids[start:start + limit]]
+        details = [item for order in orders for item in self.details.get(order.get("order_id"), {}).values()]
+        return orders, details, self.products
+
+    def stats(self) -> dict:
+        return {
+            "ready": int(self.ready),
+            "orders": len(self.orders),
+            "order_details": sum(len(items) for items in self.details.values()),
+            "products": len(self.products),
+            "lag_seconds": self.lag,
+            "seconds_since_change": time.monotonic() - self.last_change if self.last_change else 0.0,
+            "syncs": self.syncs,
+        }
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the replicated rows and their indexes."""
+        item_count = sum(len(items) for items in self.details.values())
+        items = itertools.chain.from_iterable(items.values() for items in self.details.values())
+        return (
+            sum(sys.getsizeof(index) for index in (self.orders, self.details, self.products, self._order_ids))
+            + _estimate_size(self.orders.values(), len(self.orders))
+            + _estimate_size(self.details.values(), len(self.details), sys.getsizeof)
+            + _estimate_size(items, item_count)
+            + _estimate_size(self.products.values(), len(self.products))
+        )
+
+    def collect(self):
+        """Metrics collector: publish stats() and memory_bytes() as the order_replica gauge."""
+        if not configs.order_replica_enabled:
+            return
+        for stat, value in self.stats().items():
+            replica_stats.set(value, stat=stat)
+        replica_stats.set(self.memory_bytes(), stat="memory_bytes")
+
+    async def _run(self):
+        while self._running:
+            try:
+                await self._sync()
+                while not self._feed_lost.is_set() and self._listening():
+                    try:
+                        await asyncio.wait_for(self._feed_lost.wait(), configs.order_replica_check_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                logger.warning("Order replica lost the change feed, syncing again")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Order replica sync failed, retrying in {configs.order_replica_resync_delay}s: {e}")
+            self.ready = False
+            await self._disconnect()
+            await asyncio.sleep(configs.order_replica_resync_delay)
+
+    def _listening(self) -> bool:
+        # The realtime client only reports a dropped connection by ending its listener task.
+        task = getattr(self._client, "_listen_task", None)
+        return task is not None and not task.done()
+
+    async def _sync(self):
+        # Only needed with the replica enabled, like the full supabase SDK.
+        from realtime import AsyncRealtimeClient, RealtimeSubscribeStates
+
+        url = configs.order_replica_realtime_url or f"{configs.supabase_url}/realtime/v1"
+        self._buffer = []
+        self._feed_lost = asyncio.Event()
+        # Reconnecting is left to _run, which also syncs again afterwards.
+        self._client = AsyncRealtimeClient(url, configs.supabase_key, auto_reconnect=False, max_retries=1)
+        channel = self._client.channel("order-replica")
+        for table in ("orders", "order_details", "master_products"):
+            channel.on_postgres_changes("*", self._on_change, table=table, schema=configs.order_replica_schema)
+
+        subscribed = asyncio.get_running_loop().create_future()
+
+        def on_state(state, error):
+            if not subscribed.done():
+                if state == RealtimeSubscribeStates.SUBSCRIBED:
+                    subscribed.set_result(None)
+                else:
+                    subscribed.set_exception(error or ConnectionError(f"Change feed subscription {state.value}"))
+            else:
+                # A rejoin after a channel error means changes may have been missed.
+                self.ready = False
+                self._feed_lost.set()
+
+        await channel.subscribe(on_state)
+        await asyncio.wait_for(subscribed, self._client.timeout)
+        await self._bootstrap()
+
+    async def _disconnect(self):
+        client, self._client = self._client, None
+        if client is not None:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"Error closing the order replica change feed: {e}")
+
+    async def _bootstrap(self):
+        """Load a fresh copy with bulk reads, then replay the changes buffered meanwhile."""
+        started = time.monotonic()
+        self.max_orders = configs.order_replica_max_orders
+        batch_size = configs.order_replica_bootstrap_batch_size
+
+        # One order more than fits tells whether older orders exist.
+        orders = [
+            row async for row in supabase_orders.iter_rows(
+                self.order_columns, order_by="order_id", descending=True,
+                limit=self.max_orders + 1, batch_size=batch_size,
+            )
+        ]
+        orders.reverse()
+        floor = None
+        if len(orders) > self.max_orders:
+            orders = orders[1:]
+            floor = orders[0].get("order_id") if orders else None
+
+        order_ids = [row.get("order_id") for row in orders]
+        details = []
+        for start in range(0, len(order_ids), batch_size):
+            details += await supabase_orders_details.select_in(
+                "order_id", order_ids[start:start + batch_size], columns=self.detail_columns
+            )
+        products = [
+            row async for row in supabase_products.iter_rows(self.product_columns, order_by="sku", batch_size=batch_size)
+        ]
+
+        self.floor = floor
+        self.orders = {row.get("order_id"): row for row in orders}
+        self._order_ids = sorted(self.orders)
+        self.details = {}
+        for item in details:
+            self.details.setdefault(item.get("order_id"), {})[item.get("sku")] = item
+        self.products = {row.get("sku"): row for row in products}
+
+        buffered, self._buffer = self._buffer or [], None
+        for payload in buffered:
+            self._apply(payload)
+        self.ready = True
+        self.syncs += 1
+        logger.info(
+            f"Order replica synced {len(self.orders)} orders, {len(details)} line items and "
+            f"{len(self.products)} products in {time.monotonic() - started:.2f}s, replayed {len(buffered)} changes"
+        )
+
+    def _on_change(self, payload: dict):
+        if self._buffer is not None:
+            self._buffer.append(payload)
+        else:
+            self._apply(payload)
+
+    def _apply(self, payload: dict):
+        data = payload.get("data") or {}
+        table, change = data.get("table"), data.get("type")
+        record, old_record = data.get("record") or {}, data.get("old_record") or {}
+        if table == "orders":
+            self._apply_order(change, record, old_record)
+        elif table == "order_details":
+            self._apply_detail(change, record, old_record)
+        elif table == "master_products":
+            self._apply_product(change, record, old_record)
+        else:
+            return
+        replica_changes.inc(table=table, type=change)
+        self._observe_lag(data.get("commit_timestamp"))
+
+    def _apply_order(self, change: str, record: dict, old_record: dict):
+        if change == "DELETE":
+            order_id = old_record.get("order_id")
+            if self.orders.pop(order_id, None) is not None:
+                del self._order_ids[bisect.bisect_left(self._order_ids, order_id)]
+            self.details.pop(order_id, None)
+            return
+
+        order_id = record.get("order_id")
+        if order_id is None or (self.floor is not None and order_id < self.floor):
+            return
+        if order_id not in self.orders:
+            if not self._order_ids or order_id > self._order_ids[-1]:
+                self._order_ids.append(order_id)
+            else:
+                bisect.insort(self._order_ids, order_id)
+        self.orders[order_id] = {column: record.get(column) for column in self.order_columns}
+
+        if len(self._order_ids) > self.max_orders:
+            evicted = self._order_ids[:len(self._order_ids) - self.max_orders]
+            del self._order_ids[:len(evicted)]
+            for evicted_id in evicted:
+                self.orders.pop(evicted_id, None)
+                self.details.pop(evicted_id, None)
+            self.floor = self._order_ids[0]
+
+    def _apply_detail(self, change: str, record: dict, old_record: dict):
+        if change in ("UPDATE", "DELETE") and old_record:
+            items = self.details.get(old_record.get("order_id"))
+            if items is not None:
+                items.pop(old_record.get("sku"), None)
+        if change == "DELETE":
+            return
+
+        order_id = record.get("order_id")
+        if order_id is None or (self.floor is not None and order_id < self.floor):
+            return
+        self.details.setdefault(order_id, {})[record.get("sku")] = {
+            column: record.get(column) for column in self.detail_columns
+        }
+
+    def _apply_product(self, change: str, record: dict, old_record: dict):
+        if change in ("UPDATE", "DELETE") and old_record:
+            self.products.pop(old_record.get("sku"), None)
+        if change != "DELETE" and record.get("sku") is not None:
+            self.products[record.get("sku")] = {column: record.get(column) for column in self.product_columns}
+
+    def _observe_lag(self, commit_timestamp: Optional[str]):
+        self.last_change = time.monotonic()
+        if not commit_timestamp:
+            return
+        try:
+            committed = datetime.fromisoformat(commit_timestamp)
+        except ValueError:
+            return
+        self.lag = max(0.0, time.time() - committed.timestamp())
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Set
+from src.core.config import configs
+from src.core.redis_client import redis_client, redis_subscriber
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_PAYMENT_STATUSES = {"success", "failed"}
+
+
+class PaymentEventBroker:
+    """
+    Fan out payment status changes to the clients connected to this worker.
+
+    The worker holds a single subscription to the payment status channel and
+    hands every message to the queues of the clients watching that payment, so
+    waiting clients cost an idle connection instead of repeated polls.
+    """
+
+    def __init__(self):
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        self._started = False
+        self._start_lock = asyncio.Lock()
+
+    async def start(self):
+        """Subscribe to the payment status channel once per worker."""
+        if self._started:
+            return
+        # Clients connecting together must not each register the handler.
+        async with self._start_lock:
+            if self._started:
+                return
+            await redis_subscriber.subscribe(configs.payment_status_channel, self._dispatch)
+            self._started = True
+
+    def _dispatch(self, message: dict):
+        try:
+            event = json.loads(message["data"])
+            payment_id = event["payment_id"]
+        except (TypeError, ValueError, KeyError):
+            logger.warning(f"Ignoring malformed payment status message: {message!r}")
+            return
+        for queue in self._listeners.get(payment_id, ()):
+            if queue.full():
+                # A slow client only ever needs the latest status.
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    @asynccontextmanager
+    async def listen(self, payment_id: str) -> AsyncIterator[asyncio.Queue]:
+        """Register a queue that receives every status change for a payment."""
+        await self.start()
+        queue = asyncio.Queue(maxsize=configs.payment_events_queue_size)
+        self._listeners.setdefault(payment_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            listeners = self._listeners.get(payment_id)
+            if listeners is not None:
+                listeners.discard(queue)
+                if not listeners:
+                    del self._listeners[payment_id]
+
+    async def events(self, payment_id: str) -> AsyncIterator[str]:
+        """
+        Stream a payment's status as Server-Sent Events.
+
+        Sends the last known status first, then every change as it is published,
+        with a comment line as heartbeat while idle. The stream ends once the
+        payment reaches a terminal status.
+
+        Args:
+            payment_id (str): The ID of the payment to watch.
+        """
+        async with self.listen(payment_id) as queue:
+            # Registered before reading the cache, so no change can fall in between.
+            cached = await redis_client.get(f"payment_id:{payment_id}")
+            event = json.loads(cached) if cached else None
+            while True:
+                if event is not None:
+                    yield f"event: status\ndata: {json.dumps(event)}\n\n"
+                    if event.get("status") in TERMINAL_PAYMENT_STATUSES:
+                        return
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=configs.payment_events_heartbeat)
+                except asyncio.TimeoutError:
+                    event = None
+                    yield ": keep-alive\n\n"
+
+    @property
+    def connected_clients(self) -> int:
+        return sum(len(listeners) for listeners in self._listeners.values())
+
+
+payment_event_broker = PaymentEventBroker()
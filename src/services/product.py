@@ -0,0 +1,98 @@
+import json
+import logging
+from typing import Dict, Iterable, Optional
+from src.core.cache import TTLCache
+from src.core.config import configs
+from src.core.metrics import register_cache
+from src.core.redis_client import redis_client, redis_subscriber
+from src.core.supabase_connection import supabase_products
+from src.schemas.order import Product
+from src.utils import model_columns
+
+logger = logging.getLogger(__name__)
+
+# Shared by every ProductService in the worker so invalidations reach all readers.
+product_cache = TTLCache(maxsize=configs.product_cache_size, ttl=configs.product_cache_ttl)
+register_cache("products", product_cache)
+
+# master_products columns used by the response schemas; quantity and price come from order_details.
+PRODUCT_COLUMNS = model_columns(Product, exclude={"quantity", "unit_price"})
+
+
+class ProductService:
+    async def get_products(self, skus: Iterable[str]) -> Dict[str, dict]:
+        """
+        Resolve products by SKU, serving from the in-process cache and loading
+        only the misses from master_products in a single query.
+
+        Args:
+            skus (Iterable[str]): The SKUs to resolve.
+
+        Returns:
+            dict: SKU to product row (PRODUCT_COLUMNS only) for every SKU that exists.
+        """
+        products = {}
+        missing = []
+        for sku in dict.fromkeys(skus):
+            product = product_cache.get(sku)
+            if product is None:
+                missing.append(sku)
+            else:
+                products[sku] = product
+
+        if missing:
+            for product in await supabase_products.select_in("sku", missing, columns=PRODUCT_COLUMNS):
+                product_cache.set(product.get("sku"), product)
+                products[product.get("sku")] = product
+
+        return products
+
+    def invalidate(self, skus: Optional[Iterable[str]] = None):
+        """
+        Drop cached products in this worker.
+
+        Args:
+            skus (Iterable[str], optional): The SKUs to drop; all products when omitted.
+        """
+        if skus is None:
+            product_cache.clear()
+            return
+        for sku in skus:
+            product_cache.delete(sku)
+
+    async def publish_invalidation(self, skus: Optional[Iterable[str]] = None) -> bool:
+        """
+        Tell every worker to drop cached products after master_products changes.
+
+        Args:
+            skus (Iterable[str], optional): The SKUs that changed; all products when omitted.
+
+        Returns:
+            bool: True if at least one worker received the message.
+        """
+        skus = list(skus) if skus is not None else None
+        self.invalidate(skus)
+        return await redis_client.publish(configs.product_invalidation_channel, {"skus": skus})
+
+    def handle_invalidation(self, message: dict):
+        """Apply an invalidation broadcast received over Redis pub/sub."""
+        try:
+            skus = json.loads(message["data"]).get("skus")
+        except (TypeError, ValueError, AttributeError):
+            logger.warning(f"Ignoring malformed product invalidation: {message!r}")
+            return
+        self.invalidate(skus)
+
+    async def subscribe_invalidations(self) -> bool:
+        """
+        Listen for invalidation broadcasts on the worker's shared Redis subscription.
+
+        Returns:
+            bool: False if Redis is unreachable and only the TTL bounds staleness.
+        """
+        try:
+            await redis_subscriber.subscribe(configs.product_invalidation_channel, self.handle_invalidation)
+            return True
+        except Exception as e:
+            logger.warning(f"Product cache invalidation disabled, Redis unavailable: {e}")
+            return False
@@ -1,30 +1,49 @@
+import json
+import logging
 from datetime import datetime
 from fastapi import HTTPException
 from src.core.config import configs
-from src.core.redis_client import RedisClient
+from src.core.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
 
 class RedisService:
     def __init__(self):
-        self.redis_client = RedisClient()
+        self.redis_client = redis_client
 
     async def notify_payment_status(self, payment_id: str, order_id: int, status: str):
         """
-        Notify payment status by caching the order data in Redis.
-        
+        Notify payment status by caching the order data in Redis and publishing
+        it on the payment status channel, both in a single round trip.
+
         Args:
             payment_id (str): The ID of the payment.
             order_id (int): The ID of the order.
             status (str): The payment status to cache.
         """
-        key = f"payment_id:{payment_id}"
-        order_data = {
-            "order_id": order_id,
-            "status": status,
-            "updated_at": datetime.now().isoformat()
-        }
-        self.redis_client.set(key, str(order_data), ex=3600)
+        return (await self.notify_payment_statuses([
+            {"payment_id": payment_id, "order_id": order_id, "status": status}
+        ]))[0]
+
+    async def notify_payment_statuses(self, updates: list[dict]):
+        """
+        Cache and publish several payment statuses in a single pipeline.
 
-        return order_data
+        Args:
+            updates (list[dict]): Dicts with payment_id, order_id and status.
+        """
+        if not updates:
+            return []
+        updated_at = datetime.now().isoformat()
+        notifications = [{**update, "updated_at": updated_at} for update in updates]
+        async with self.redis_client.pipeline() as pipe:
+            for order_data in notifications:
+                payload = json.dumps(order_data)
+                pipe.set(f"payment_id:{order_data['payment_id']}", payload, ex=configs.payment_status_ttl)
+                pipe.publish(configs.payment_status_channel, payload)
+            await pipe.execute()
+
+        return notifications
 
     # async def get_payment_status(self, order_id: int, payment_id: str) -> dict:
     #     """
@@ -33,14 +52,14 @@ class RedisService:
     #     Args:
     #         order_id (int): The ID of the order to retrieve.
     #         payment_id (str): The ID of the payment to retrieve.
-        
+
     #     Returns:
     #         dict: The cached order data or None if not found.
     #     """
     #     key = f"payment_id:{payment_id}"
-    #     cached_data = self.redis_client.get(key)
-    #     return eval(cached_data) if cached_data else None
-    
+    #     cached_data = await self.redis_client.get(key)
+    #     return json.loads(cached_data) if cached_data else None
+
     async def publish_message(self, channel: str, message: str) -> bool:
         """
         Publish a message to a Redis channel.
@@ -48,17 +67,15 @@ class RedisService:
         Args:
             channel (str): The channel to publish to.
             message (str): The message to publish.
-        
+
         Returns:
             bool: True if the message was published successfully, False otherwise.
         """
-        
+
         try:
-            x = self.redis_client.publish(channel, message)
-            print(f"Publishing 2 message to channel {channel}: {message}")
+            x = await self.redis_client.publish(channel, message)
+            logger.debug(f"Published message to channel {channel}: {message}, receivers {x}")
         except Exception as e:
-            print(f"Error publishing message to Redis: {e}")
+            logger.error(f"Error publishing message to Redis: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to publish message: {str(e)}")
-        print(f"Publishing 3 message to channel {channel}: {message}")
-        print(x)
         return x
@@ -7,3 +7,8 @@ def singleton(class_):
         return instances[class_]
 
     return getinstance
+
+
+def model_columns(model, exclude=()) -> list:
+    """Field names of a pydantic model minus `exclude`, for use as a select column list."""
+    return [name for name in model.model_fields if name not in exclude]